@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Benchmarks over the WINTER 25-26 COURSE UPDATES corpus.
+
+Each subcommand times a current code path against the implementation it
+replaced and checks that both give the same result on every course page.
+parse only checks results: it compares the configured read-only HTML
+parser with html.parser.
+
+Usage:
+    python3 benchmark-course-corpus.py rewrite [--repeat N]
+    python3 benchmark-course-corpus.py mapping [--repeat N]
+    python3 benchmark-course-corpus.py parse [--repeat N]
+    python3 benchmark-course-corpus.py align [--repeat N]
+
+align compares mapping quality rather than requiring identical output,
+since the aligner is meant to produce different (better) mappings.
+"""
+
+import argparse
+import contextlib
+import functools
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+COURSE_DIR = Path(__file__).parent
+HTML_DIR = COURSE_DIR / "WINTER 25-26 COURSE UPDATES"
+
+def load_script(filename):
+    """Import one of the hyphenated scripts in this directory as a module."""
+    path = COURSE_DIR / filename
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def corpus_files(include_backups=True):
+    """Return the course HTML files (and their .bak copies) in a stable order."""
+    files = sorted(HTML_DIR.rglob("*.html"))
+    if include_backups:
+        files += sorted(HTML_DIR.rglob("*.html.bak"))
+    return files
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of func() over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def report(name, legacy_time, current_time, mismatches, total):
+    """Print timings (unless None) and the equivalence check for one benchmark."""
+    print(f"\n📊 {name}")
+    if legacy_time is not None:
+        print(f"   Legacy:  {legacy_time * 1000:9.2f} ms")
+        print(f"   Current: {current_time * 1000:9.2f} ms")
+        if current_time:
+            print(f"   Speedup: {legacy_time / current_time:9.2f}x")
+    if mismatches:
+        print(f"   ❌ {len(mismatches)}/{total} results differ:")
+        for item in mismatches[:10]:
+            print(f"      {item}")
+    else:
+        print(f"   ✅ Identical results for all {total} inputs")
+
+# --- rewrite: download-page-content.py body rewriting -----------------------
+
+def legacy_strip_wrappers(body_content):
+    """The user_content wrapper removal from write_page as it was before
+    rewrite_page_body."""
+    # Remove any existing user_content wrapper from body content (we'll add our own)
+    # Remove opening user_content divs
+    body_content = re.sub(r'<div\s+class=["\']user_content["\']>\s*', '', body_content, flags=re.IGNORECASE)
+    # Remove closing user_content divs and comments
+    body_content = re.sub(r'</div>\s*<!--\s*end\s+user_content\s*-->', '', body_content, flags=re.IGNORECASE)
+    body_content = re.sub(r'</div>\s*<!--\s*end user_content\s*-->', '', body_content, flags=re.IGNORECASE)
+    # Also remove any standalone closing divs that might be leftover
+    body_content = body_content.strip()
+    return body_content
+
+def legacy_replace_image_urls(html_content, html_file_path, base_dir, image_index=None, find_local_image=None):
+    """replace_image_urls from download-page-content.py as it was before
+    rewrite_page_body, unchanged apart from taking find_local_image and
+    dropping an unused import."""
+    import re
+
+    def replace_url(match):
+        full_match = match.group(0)
+        url = match.group(1) or match.group(2)
+
+        # Skip data URLs and local paths
+        if url.startswith('data:') or url.startswith('#') or not url.startswith('http'):
+            return full_match
+
+        # Only process Canvas image URLs
+        if 'instructure.com' not in url and 'canvas' not in url.lower():
+            return full_match
+
+        # Find local image
+        local_path = find_local_image(url, base_dir, image_index)
+        if local_path:
+            # Calculate relative path from HTML file to image
+            html_dir = html_file_path.parent
+            try:
+                rel_path = os.path.relpath(base_dir / local_path, html_dir)
+                # Normalize path separators for web
+                rel_path = rel_path.replace('\\', '/')
+                return full_match.replace(url, rel_path)
+            except ValueError:
+                # Paths on different drives (Windows) - use absolute-ish path
+                return full_match
+
+        return full_match
+
+    # Replace img src attributes
+    html_content = re.sub(
+        r'(<img[^>]+src=["\'])([^"\']+)(["\'][^>]*>)',
+        replace_url,
+        html_content,
+        flags=re.IGNORECASE
+    )
+
+    # Replace background-image URLs in style attributes
+    html_content = re.sub(
+        r'(background-image:\s*url\(["\']?)([^"\'()]+)(["\']?\))',
+        replace_url,
+        html_content,
+        flags=re.IGNORECASE
+    )
+
+    # Replace CSS link hrefs that point to images
+    html_content = re.sub(
+        r'(<link[^>]+href=["\'])([^"\']+\.(png|jpg|jpeg|gif|svg))(["\'])',
+        replace_url,
+        html_content,
+        flags=re.IGNORECASE
+    )
+
+    return html_content
+
+def resolvable_image_page(image_index, count=5):
+    """A page body whose Canvas image URLs name images in the course tree.
+
+    No corpus page has a Canvas image URL that resolves to a local file, so
+    the corpus comparison never covers a successful lookup. The old code
+    left these URLs alone (it looked up the text before each URL), so this
+    page is checked separately: every URL must become a local path.
+    """
+    names = sorted(name for name in image_index.by_name if name.lower().endswith(('.png', '.jpg', '.gif')))
+    lines = ['<div class="user_content">']
+    for n, name in enumerate(names[:count]):
+        url = f"https://usucourses.instructure.com/courses/2879/files/{n}/{name}"
+        lines.append(f'<p><img src="{url}" alt="" style="background-image: url(\'{url}\')"></p>')
+        lines.append(f'<div style="background-image: url({url})"></div>')
+        lines.append(f'<link rel="icon" href="{url}">')
+    lines.append('</div> <!-- end user_content -->')
+    return '\n'.join(lines)
+
+def bench_rewrite(args):
+    """Legacy multi-pass body rewriting vs rewrite_page_body."""
+    downloader = load_script("download-page-content.py")
+    image_index = downloader.get_image_index(COURSE_DIR)
+
+    pages = []
+    for html_file in corpus_files():
+        content = html_file.read_text(encoding='utf-8')
+        match = re.search(r'<div class="content">(.*?)<div class="original-link">', content, re.DOTALL)
+        pages.append((html_file, match.group(1) if match else content))
+    print(f"📖 Loaded {len(pages)} pages ({sum(len(body) for _, body in pages) / 1024:.0f} KB of body HTML)")
+
+    def run_legacy():
+        return [legacy_replace_image_urls(legacy_strip_wrappers(body), path, COURSE_DIR, image_index,
+                                          downloader.find_local_image)
+                for path, body in pages]
+
+    def run_current():
+        return [downloader.rewrite_page_body(body, path, COURSE_DIR, image_index) for path, body in pages]
+
+    mismatches = [str(path.relative_to(HTML_DIR))
+                  for (path, _), old, new in zip(pages, run_legacy(), run_current()) if old != new]
+    report("Page body rewrite", time_call(run_legacy, args.repeat), time_call(run_current, args.repeat),
+           mismatches, len(pages))
+
+    image_page = HTML_DIR / "1 Start Here" / "resolvable-images.html"
+    rewritten = downloader.rewrite_page_body(resolvable_image_page(image_index), image_page, COURSE_DIR, image_index)
+    local_paths = re.findall(r'(?:src="|href="|url\(\'?)([^"\')]+)', rewritten)
+    unresolved = [path for path in local_paths if path.startswith('http') or not (image_page.parent / path).exists()]
+    if unresolved:
+        print(f"   ❌ {len(unresolved)}/{len(local_paths)} Canvas image URLs not mapped to local files:")
+        for path in unresolved[:10]:
+            print(f"      {path}")
+    else:
+        print(f"   ✅ All {len(local_paths)} resolvable Canvas image URLs mapped to local files")
+    return not mismatches and not unresolved
+
+# --- mapping: applying tracked changes through a DOCX-HTML mapping ----------
+
+MAPPING_TAGS = ['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+def legacy_apply_mapping(soup, user_content, mapping, changes):
+    """update_html_using_mapping from update-html-using-mapping.py as it was
+    before html_changes.apply_mapped_changes: the element list is rebuilt
+    for every mapping entry and every unmapped insertion."""
+    para_to_html = {}
+    for mapping_entry in mapping['mapping']:
+        docx_idx = mapping_entry['docx_index']
+        html_idx = mapping_entry['html_index']
+        html_elements = list(user_content.find_all(MAPPING_TAGS))
+        if html_idx < len(html_elements):
+            para_to_html[docx_idx] = html_elements[html_idx]
+
+    for deletion in changes['deletions']:
+        para_idx = deletion.get('paragraph_index')
+        deleted_text = deletion['text'].strip()
+        if para_idx is not None and para_idx in para_to_html:
+            html_elem = para_to_html[para_idx]
+            elem_text = html_elem.get_text()
+            if deleted_text in elem_text:
+                new_text = elem_text.replace(deleted_text, '')
+                html_elem.clear()
+                html_elem.string = new_text
+
+    for insertion in changes['insertions']:
+        para_idx = insertion.get('paragraph_index')
+        new_text = insertion['text'].strip()
+        if para_idx is not None and para_idx in para_to_html:
+            html_elem = para_to_html[para_idx]
+            new_p = soup.new_tag('p')
+            new_p.string = new_text
+            html_elem.insert_after(new_p)
+        else:
+            new_p = soup.new_tag('p')
+            new_p.string = new_text
+            last_elem = None
+            for elem in user_content.find_all(MAPPING_TAGS):
+                last_elem = elem
+            if last_elem:
+                last_elem.insert_after(new_p)
+            else:
+                user_content.append(new_p)
+
+NESTED_END_PAGE = ('<html><body><div class="user_content"><p>First paragraph</p>'
+                   '<div class="wrapper"><p>Last paragraph</p></div></div></body></html>')
+
+def mapping_changes(mapping, user_content):
+    """Synthetic tracked changes touching every mapped paragraph.
+
+    Each mapped paragraph gets an insertion; those whose element has no
+    nested block elements also lose their first word. Two insertions for
+    paragraphs with no mapping entry (and one without a paragraph index)
+    exercise the fallback that appends to the end of the page.
+    """
+    html_elements = user_content.find_all(MAPPING_TAGS)
+    changes = {'insertions': [], 'deletions': []}
+    for entry in mapping['mapping']:
+        element = html_elements[entry['html_index']]
+        words = entry['html_text_preview'].split()
+        if words and not element.find(MAPPING_TAGS):
+            changes['deletions'].append({'text': words[0], 'paragraph_index': entry['docx_index']})
+        changes['insertions'].append({'text': f"Inserted after {entry['docx_index']}",
+                                      'paragraph_index': entry['docx_index']})
+    unmapped = max((entry['docx_index'] for entry in mapping['mapping']), default=-1) + 1
+    for paragraph_index in (unmapped, None, unmapped + 1):
+        changes['insertions'].append({'text': f"Unmapped insertion {paragraph_index}",
+                                      'paragraph_index': paragraph_index})
+    return changes
+
+def bench_mapping(args):
+    """Per-entry element scans vs one element table in apply_mapped_changes."""
+    from bs4 import BeautifulSoup
+    from html_changes import apply_mapped_changes
+
+    cases = []
+    for mapping_file in sorted(HTML_DIR.rglob("*.mapping.json")):
+        html_file = mapping_file.with_name(mapping_file.name.replace('.mapping.json', '.html'))
+        if not html_file.exists():
+            continue
+        mapping = json.loads(mapping_file.read_text(encoding='utf-8'))
+        html = html_file.read_text(encoding='utf-8')
+        user_content = BeautifulSoup(html, 'html.parser').find('div', class_='user_content')
+        cases.append((html_file, html, mapping, mapping_changes(mapping, user_content)))
+    # No corpus page ends in a wrapper <div>, where "after the last block
+    # element" and "after the last child" differ
+    html = NESTED_END_PAGE
+    mapping = {'mapping': [{'docx_index': 0, 'html_index': 0, 'html_text_preview': 'First paragraph'}]}
+    user_content = BeautifulSoup(html, 'html.parser').find('div', class_='user_content')
+    cases.append((HTML_DIR / 'nested-end.html', html, mapping, mapping_changes(mapping, user_content)))
+    print(f"📖 Loaded {len(cases)} mapped pages "
+          f"({sum(len(m['mapping']) for _, _, m, _ in cases)} mapping entries, "
+          f"{sum(len(c['insertions']) + len(c['deletions']) for _, _, _, c in cases)} changes)")
+
+    def run(apply):
+        """Apply to freshly parsed pages; return the best time and the output."""
+        best = None
+        for _ in range(args.repeat):
+            soups = [BeautifulSoup(html, 'html.parser') for _, html, _, _ in cases]
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for soup, (_, _, mapping, changes) in zip(soups, cases):
+                    apply(soup, soup.find('div', class_='user_content'), mapping, changes)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, [str(soup) for soup in soups]
+
+    legacy_time, legacy_output = run(legacy_apply_mapping)
+    # update-html-using-mapping.py's entry point, which keeps its old fallback
+    current_time, current_output = run(functools.partial(apply_mapped_changes, after_last_element=True))
+    mismatches = [str(path.relative_to(HTML_DIR))
+                  for (path, _, _, _), old, new in zip(cases, legacy_output, current_output) if old != new]
+    report("Mapped change application", legacy_time, current_time, mismatches, len(cases))
+    return not mismatches
+
+# --- parse: read-only page extraction through html_parsing ----------------
+
+def bench_parse(args):
+    """html.parser vs html_parsing's read-only parser: same extraction?
+
+    The read-only parser is html.parser unless COURSE_HTML_PARSER is set,
+    so run with COURSE_HTML_PARSER=lxml to check lxml. Only html-to-docx
+    reads pages with it (everything else needs the round-trip parser), so
+    its cleaned user_content is compared for every page. Nothing is timed:
+    with the default parser both sides are the same code.
+    """
+    from html_parsing import PARSER_ENV, ROUND_TRIP_PARSER, read_parser
+
+    to_docx = load_script("html-to-docx.py")
+    files = corpus_files(include_backups=False)
+    print(f"📖 Loaded {len(files)} pages; read-only parser: {read_parser()}")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [str(to_docx.extract_user_content(path)) for path in files]
+
+    current_results = run()
+    configured = os.environ.get(PARSER_ENV)
+    os.environ[PARSER_ENV] = ROUND_TRIP_PARSER
+    try:
+        reference_results = run()
+    finally:
+        if configured is None:
+            del os.environ[PARSER_ENV]
+        else:
+            os.environ[PARSER_ENV] = configured
+
+    mismatches = [str(path.relative_to(HTML_DIR))
+                  for path, old, new in zip(files, reference_results, current_results) if old != new]
+    report("Page extraction", None, None, mismatches, len(files))
+    return not mismatches
+
+# --- align: create-docx-html-mapping.py create_mapping --------------------
+
+ALIGN_MAPPING_FILE = HTML_DIR / "1 Start Here" / "Course Orientation.mapping.json"
+
+def legacy_similarity(text1, text2):
+    """calculate_similarity as it was before docx_html_alignment."""
+    def normalize(text):
+        text = re.sub(r'\s+', ' ', text.lower().strip())
+        return text.replace('&amp;', '&').replace('&nbsp;', ' ')
+
+    norm1, norm2 = normalize(text1), normalize(text2)
+    if not norm1 or not norm2:
+        return 0.0
+    if norm1 == norm2:
+        return 1.0
+    if norm1 in norm2 or norm2 in norm1:
+        return 0.8
+    words1, words2 = set(norm1.split()), set(norm2.split())
+    if words1 and words2:
+        total = len(words1 | words2)
+        if total > 0:
+            return len(words1 & words2) / total
+    return 0.0
+
+def legacy_create_mapping(docx_structure, html_structure):
+    """The greedy mapper: each paragraph takes the best-scoring element not
+    yet used, wherever it is on the page, re-checking the mapping list for
+    every candidate."""
+    mapping = []
+    for docx_para in docx_structure:
+        best_match = None
+        best_score = 0.0
+        for html_elem in html_structure:
+            if any(m['html_index'] == html_elem['index'] for m in mapping):
+                continue
+            score = legacy_similarity(docx_para['text'], html_elem['text'])
+            if score > best_score and score >= 0.3:
+                best_score = score
+                best_match = html_elem
+        if best_match and best_score >= 0.3:
+            mapping.append({'docx_index': docx_para['index'], 'html_index': best_match['index'],
+                            'similarity_score': round(best_score, 3)})
+    return mapping
+
+def mapping_quality(mapping, html_structure):
+    """Pairs, out-of-order pairs, pairs on wrapper elements, exact-text pairs."""
+    texts = {elem['index']: ' '.join(elem['text'].split()) for elem in html_structure}
+    order = [elem['index'] for elem in html_structure]
+    wrappers = {order[k] for k in range(len(order) - 1)
+                if texts[order[k + 1]] and len(texts[order[k]]) > len(texts[order[k + 1]])
+                and texts[order[k]].startswith(texts[order[k + 1]])}
+    html_indexes = [entry['html_index'] for entry in mapping]
+    return {
+        'pairs': len(mapping),
+        'out_of_order': sum(1 for a, b in zip(html_indexes, html_indexes[1:]) if b < a),
+        'on_wrappers': sum(1 for index in html_indexes if index in wrappers),
+        'exact': sum(1 for entry in mapping if entry['similarity_score'] == 1.0),
+    }
+
+def bench_align(args):
+    """Greedy create_mapping vs the banded order-preserving alignment."""
+    mapper = load_script("create-docx-html-mapping.py")
+    data = json.loads(ALIGN_MAPPING_FILE.read_text(encoding='utf-8'))
+    docx_structure, html_structure = data['docx_structure'], data['html_structure']
+    print(f"📖 {ALIGN_MAPPING_FILE.stem}: {len(docx_structure)} DOCX paragraphs, "
+          f"{len(html_structure)} HTML elements")
+
+    legacy = legacy_create_mapping(docx_structure, html_structure)
+    current = mapper.create_mapping(docx_structure, html_structure)
+    legacy_time = time_call(lambda: legacy_create_mapping(docx_structure, html_structure), args.repeat)
+    current_time = time_call(lambda: mapper.create_mapping(docx_structure, html_structure), args.repeat)
+
+    print(f"\n📊 DOCX-HTML mapping")
+    print(f"   Legacy:  {legacy_time * 1000:9.2f} ms")
+    print(f"   Current: {current_time * 1000:9.2f} ms")
+    if current_time:
+        print(f"   Speedup: {legacy_time / current_time:9.2f}x")
+    legacy_quality = mapping_quality(legacy, html_structure)
+    current_quality = mapping_quality(current, html_structure)
+    print(f"   {'':14} {'Legacy':>8} {'Current':>8}")
+    for key in legacy_quality:
+        print(f"   {key:14} {legacy_quality[key]:8} {current_quality[key]:8}")
+    legacy_pairs = {entry['docx_index']: entry['html_index'] for entry in legacy}
+    current_pairs = {entry['docx_index']: entry['html_index'] for entry in current}
+    changed = sorted(index for index in set(legacy_pairs) | set(current_pairs)
+                     if legacy_pairs.get(index) != current_pairs.get(index))
+    print(f"   Paragraphs mapped differently: {changed}")
+    ok = current_quality['out_of_order'] == 0
+    print(f"   {'✅' if ok else '❌'} Current mapping is in document order")
+    return ok
+
+BENCHMARKS = {
+    'align': bench_align,
+    'mapping': bench_mapping,
+    'parse': bench_parse,
+    'rewrite': bench_rewrite,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark code paths over the course HTML corpus')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'], help='Benchmark to run')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation; the best time is reported (default: 5)')
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    results = [BENCHMARKS[name](args) for name in names]
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == '__main__':
+    main()
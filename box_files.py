@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for downloading files from Box.
+
+Downloads are streamed in chunks into a spooled temporary file: small files
+stay in memory, large ones spill to disk, so a DOCX full of embedded media
+does not have to fit in RAM. The SHA-1 (which Box reports for every file
+version) is computed while streaming. The returned file object is seekable
+and can be handed straight to zipfile.
+
+BoxFileCache keeps recent downloads on disk keyed by file ID and SHA-1, so
+re-running a script against an unchanged file costs one small metadata
+request instead of a full download.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import requests
+
+import http_client
+
+BOX_API_BASE = "https://api.box.com/2.0"
+CHUNK_SIZE = 1024 * 1024
+# Downloads up to this size stay in memory; larger ones are spooled to disk
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# Total size of cached downloads kept before the least recently used are evicted
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+def stream_to_spool(response):
+    """Copy a streamed response body into a spooled temporary file.
+
+    Returns (file, sha1_hex) with the file rewound to the start.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    sha1 = hashlib.sha1()
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if chunk:
+            sha1.update(chunk)
+            spool.write(chunk)
+    spool.seek(0)
+    return spool, sha1.hexdigest()
+
+def _stream_url(url, headers=None):
+    with http_client.get(url, headers=headers, stream=True) as response:
+        response.raise_for_status()
+        return stream_to_spool(response)
+
+def download_file_content(file_id, access_token):
+    """Download a Box file's content without holding it all in memory.
+
+    Tries GET /files/{id}/content first. File metadata is only requested if
+    that returns 403, to look for a shared-link or temporary download URL.
+
+    Returns (file, sha1_hex) where file is a seekable file object.
+    """
+    headers = {'Authorization': f'Bearer {access_token}'}
+    content_url = f'{BOX_API_BASE}/files/{file_id}/content'
+    try:
+        return _stream_url(content_url, headers)
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 403:
+            raise
+
+    # 403: look for another way to download the file
+    info_url = f'{BOX_API_BASE}/files/{file_id}?fields=sha1,shared_link,download_url'
+    info_response = http_client.get(info_url, headers=headers)
+    info_response.raise_for_status()
+    file_info = info_response.json()
+
+    shared_link = file_info.get('shared_link') or {}
+    download_url = shared_link.get('download_url') or file_info.get('download_url')
+    if not download_url:
+        raise Exception(f"403 Forbidden: Token does not have permission to download file content. "
+                        f"You may need to grant 'Read all files and folders' permission to your Box app, "
+                        f"or use a token with higher permissions.")
+
+    spool, sha1 = _stream_url(download_url)
+    if file_info.get('sha1') and file_info['sha1'] != sha1:
+        spool.close()
+        raise Exception(f"Downloaded content for Box file {file_id} does not match its SHA-1")
+    return spool, sha1
+
+def get_file_info(file_id, access_token, fields):
+    """Return selected fields of a Box file's metadata."""
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = http_client.get(f'{BOX_API_BASE}/files/{file_id}', headers=headers,
+                            params={'fields': ','.join(fields)})
+    response.raise_for_status()
+    return response.json()
+
+class BoxFileCache:
+    """Size-bounded LRU cache of downloaded Box files.
+
+    Each entry is stored as <file_id>-<sha1> in cache_dir; a file's mtime
+    records when it was last used. Storing a new version of a file removes
+    the old one, and the least recently used entries are evicted once the
+    cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def _entries(self, file_id=None):
+        if not self.cache_dir.exists():
+            return []
+        pattern = f'{file_id}-*' if file_id is not None else '*-*'
+        return [p for p in self.cache_dir.glob(pattern) if p.is_file() and not p.name.startswith('.')]
+
+    def cached_sha1(self, file_id):
+        """Return the SHA-1 of the cached copy of file_id, or None."""
+        entries = self._entries(file_id)
+        return entries[0].name.split('-', 1)[1] if entries else None
+
+    def open(self, file_id, sha1):
+        """Open the cached copy of this file version, or return None."""
+        path = self.cache_dir / f'{file_id}-{sha1}'
+        try:
+            os.utime(path)
+            return open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+    def put(self, file_id, sha1, fileobj):
+        """Store fileobj as the cached copy of file_id, then rewind fileobj."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for old in self._entries(file_id):
+            old.unlink(missing_ok=True)
+        fileobj.seek(0)
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix='.tmp-', delete=False) as tmp:
+            shutil.copyfileobj(fileobj, tmp, CHUNK_SIZE)
+        os.replace(tmp.name, self.cache_dir / f'{file_id}-{sha1}')
+        fileobj.seek(0)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # removed by another thread
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+def download_file_cached(file_id, access_token, cache):
+    """Download a Box file, reusing the cached copy if it is still current.
+
+    With a cached copy, one metadata request (sha1 and file_version) decides
+    whether it matches the current version on Box; without one the file is
+    downloaded straight away. Returns (file, sha1, from_cache); the caller
+    closes file (a cached copy is an open file in the cache directory).
+    """
+    cached_sha1 = cache.cached_sha1(file_id)
+    if cached_sha1:
+        try:
+            info = get_file_info(file_id, access_token, ['sha1', 'file_version'])
+        except requests.exceptions.RequestException:
+            info = {}
+        current_sha1 = info.get('sha1') or (info.get('file_version') or {}).get('sha1')
+        if current_sha1 == cached_sha1:
+            cached = cache.open(file_id, cached_sha1)
+            if cached:
+                return cached, cached_sha1, True
+
+    fileobj, sha1 = download_file_content(file_id, access_token)
+    try:
+        cache.put(file_id, sha1, fileobj)
+    except BaseException:
+        fileobj.close()
+        raise
+    return fileobj, sha1, False
+
+def as_seekable(content):
+    """Return a rewound file object for DOCX bytes or an open file object."""
+    if isinstance(content, (bytes, bytearray)):
+        return io.BytesIO(content)
+    content.seek(0)
+    return content
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Breadth-first crawler for Box folder trees.
+
+Walking the course folder depth-first costs one blocking request per folder
+in turn, so the scan time is the sum of every round trip. crawl() lists the
+folders of each level on a bounded thread pool instead: every subfolder is
+queued as soon as its parent has been listed, and files are yielded as their
+folder's listing arrives, in breadth-first order (the same order on every
+run). Listings follow Box's marker pagination, so folders with more than
+PAGE_LIMIT items are read in full, and ask only for the fields the scan uses.
+
+FolderListingCache makes rescans incremental. It keeps each folder's
+listing together with the folder's etag, sequence_id and modified_at as
+reported in its parent's listing. When a rescan finds them unchanged, the
+cached listing is used instead of a request, and so is every cached listing
+below it: an unchanged folder's subfolders still carry the versions they
+were cached with. Only the root and the folders that changed are listed.
+
+scan_docx_files() is the .docx scan shared by get-box-file-ids-rest.py and
+get-box-file-ids-api.py; each passes a function that lists one folder.
+"""
+
+import json
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import http_client
+from box_files import BOX_API_BASE
+
+# Item fields the crawl needs; Box returns only these. The last three
+# identify a version of a subfolder for FolderListingCache.
+FOLDER_ITEM_FIELDS = ('type', 'id', 'name', 'etag', 'sequence_id', 'modified_at')
+# Largest page Box serves for a marker-paginated folder listing
+PAGE_LIMIT = 1000
+# Folders listed at once
+DEFAULT_MAX_WORKERS = 8
+
+def list_folder_items(folder_id, headers, fields=FOLDER_ITEM_FIELDS):
+    """Yield every item in a Box folder, one page request at a time.
+
+    Raises requests.exceptions.RequestException if a page cannot be read.
+    """
+    url = f"{BOX_API_BASE}/folders/{folder_id}/items"
+    params = {'fields': ','.join(fields), 'limit': PAGE_LIMIT, 'usemarker': 'true'}
+    while True:
+        response = http_client.get(url, headers=headers, params=params)
+        response.raise_for_status()
+        data = response.json()
+        yield from data.get('entries', [])
+        marker = data.get('next_marker')
+        if not marker:
+            return
+        params['marker'] = marker
+
+def join_path(base_path, name):
+    return f"{base_path}/{name}" if base_path else name
+
+def print_folder_error(folder_id, path, error):
+    """Default crawl() on_error: report the folder and carry on."""
+    where = f" ({path})" if path else ""
+    print(f"  ⚠️  Error accessing folder {folder_id}{where}: {error}")
+    response = getattr(error, 'response', None)
+    if response is not None:
+        print(f"     Response: {response.text[:200]}")
+
+def folder_version(item):
+    """(etag, sequence_id, modified_at) of a folder item, or None if Box left them out."""
+    version = [item.get('etag'), item.get('sequence_id'), item.get('modified_at')]
+    return version if any(field is not None for field in version) else None
+
+class FolderListingCache:
+    """Folder listings from earlier crawls, reused while the folder is unchanged.
+
+    With a cache_file the listings are loaded from it on first use and
+    written back by save(); only folders reached by the latest crawl are
+    kept, so deleted and failed folders are listed afresh next time. With
+    refresh the file is not read, so every folder is listed and recorded.
+    """
+
+    CACHE_VERSION = 1
+
+    def __init__(self, cache_file=None, refresh=False):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self.refresh = refresh
+        self._folders = None
+        self._seen = set()
+        self._dirty = False
+        self.reused = 0
+        self.listed = 0
+
+    def _load(self):
+        self._folders = {}
+        if not self.cache_file or self.refresh:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == self.CACHE_VERSION and cached['fields'] == list(FOLDER_ITEM_FIELDS):
+                self._folders = cached['folders']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, folder_id, version):
+        """The cached items of folder_id if it was cached at this version, else None."""
+        if self._folders is None:
+            self._load()
+        entry = self._folders.get(str(folder_id))
+        if version is None or entry is None or entry['version'] != version:
+            return None
+        self._seen.add(str(folder_id))
+        self.reused += 1
+        return entry['items']
+
+    def put(self, folder_id, version, items):
+        """Record a fresh listing of folder_id."""
+        if self._folders is None:
+            self._load()
+        self._folders[str(folder_id)] = {'version': version, 'items': items}
+        self._seen.add(str(folder_id))
+        self._dirty = True
+        self.listed += 1
+
+    def save(self):
+        """Write the folders reached by this crawl to the cache file."""
+        if not self.cache_file or self._folders is None:
+            return
+        if not self._dirty and self._seen == set(self._folders):
+            return
+        folders = {folder_id: entry for folder_id, entry in self._folders.items() if folder_id in self._seen}
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_file.parent,
+                                             prefix='.tmp-', suffix='.json', delete=False) as tmp:
+                json.dump({'version': self.CACHE_VERSION, 'fields': list(FOLDER_ITEM_FIELDS),
+                           'folders': folders}, tmp)
+            os.replace(tmp.name, self.cache_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"  ⚠️  Could not write folder cache: {e}")
+
+def crawl(list_items, root_id, max_workers=DEFAULT_MAX_WORKERS, skip_folder=None,
+          on_error=print_folder_error, cache=None):
+    """Walk the folder tree under root_id breadth-first.
+
+    list_items(folder_id) returns the folder's items as dicts with 'type',
+    'id' and 'name'; up to max_workers folders are listed at once. Yields
+    (path, item) for every file, where path is its folder's path relative
+    to root_id ('' for root_id itself). Subfolders whose path skip_folder
+    returns True for are not listed. A folder that cannot be listed is
+    passed to on_error(folder_id, path, error) and its subtree skipped.
+
+    With a FolderListingCache, subfolders whose version matches the cache
+    are not listed (root_id always is) and fresh listings are recorded.
+    """
+    def list_all(folder_id):
+        return list(list_items(folder_id))
+
+    def start(folder_id, version):
+        """Return (future of the folder's items, whether they came from the cache)."""
+        items = cache.get(folder_id, version) if cache is not None else None
+        if items is None:
+            return executor.submit(list_all, folder_id), False
+        future = Future()
+        future.set_result(items)
+        return future, True
+
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='box-crawl')
+    try:
+        pending = deque([(root_id, '', None, *start(root_id, None))])
+        while pending:
+            folder_id, path, version, future, cached = pending.popleft()
+            try:
+                items = future.result()
+            except Exception as e:
+                on_error(folder_id, path, e)
+                continue
+            if cache is not None and not cached:
+                cache.put(folder_id, version, items)
+            for item in items:
+                if item['type'] == 'folder':
+                    subfolder_path = join_path(path, item['name'])
+                    if skip_folder and skip_folder(subfolder_path):
+                        continue
+                    version = folder_version(item)
+                    pending.append((item['id'], subfolder_path, version, *start(item['id'], version)))
+                elif item['type'] == 'file':
+                    yield path, item
+    finally:
+        # Stop listing if the caller abandons the crawl
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def is_export_folder(path):
+    return 'Course Export' in path
+
+def scan_docx_files(list_items, root_id, max_workers=DEFAULT_MAX_WORKERS, cache=None):
+    """Yield a box-file-ids entry for each .docx file under root_id.
+
+    Course Export folders are not crawled and "-test" files are skipped.
+    Entries are yielded as their folders are listed (see crawl()).
+    """
+    for path, item in crawl(list_items, root_id, max_workers, skip_folder=is_export_folder, cache=cache):
+        if not item['name'].endswith('.docx') or '-test' in item['name'].lower():
+            continue
+        rel_path = join_path(path, item['name'])
+        print(f"  ✅ Found: {rel_path} (ID: {item['id']})")
+        yield {
+            'relative_path': rel_path,
+            'file_id': str(item['id']),
+            'box_url': f"https://usu.app.box.com/file/{item['id']}",
+            'name': item['name'],
+            'notes': ''
+        }
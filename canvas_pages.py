@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for looking up and fetching Canvas pages.
+
+The scripts in this project resolve page titles (from redirect files, the
+DOCX mapping, canvas-page-links.json) to Canvas pages. PageIndex lists the
+pages once and answers every lookup from memory. fetch_concurrently runs
+page fetches on a small thread pool, throttled by Canvas's rate-limit headers.
+SyncManifest remembers which Canvas revision each local file was built from.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from http_client import configure_session
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def normalize_title(title):
+    """Collapse runs of whitespace in a title."""
+    return ' '.join(title.split())
+
+def title_tokens(title):
+    """Return the set of case-folded word tokens in a title."""
+    return frozenset(TOKEN_PATTERN.findall(title.casefold()))
+
+class PageIndex:
+    """In-memory title index over a set of pages.
+
+    Each entry is a (title, item) pair; item is whatever the caller wants back
+    (a canvasapi Page, a Canvas URL, ...), optionally registered under a key
+    such as the page's URL slug. Lookups try, in order: exact title,
+    case-folded title, and identical token set. The fuzzy methods use an
+    inverted token index so only pages sharing a word with the query are scored.
+    When several pages match equally well, the one indexed first wins.
+    """
+
+    def __init__(self, entries=()):
+        self._titles = []
+        self._items = []
+        self._token_sets = []
+        self._exact = {}
+        self._folded = {}
+        self._by_tokens = {}
+        self._postings = {}
+        self._by_key = {}
+        for title, item in entries:
+            self.add(title, item)
+
+    @classmethod
+    def from_course(cls, course, include_body=False):
+        """Build an index from a single listing of the course's pages.
+
+        Pages are keyed by their URL slug. With include_body the listing asks
+        Canvas for page bodies too (include[]=body), so the indexed pages can
+        be written out without fetching each one again.
+        """
+        kwargs = {'per_page': 100}
+        if include_body:
+            kwargs['include'] = ['body']
+        index = cls()
+        for page in course.get_pages(**kwargs):
+            index.add(page.title, page, key=page.url)
+        return index
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, title, item, key=None):
+        """Add a page to the index."""
+        if key is not None:
+            self._by_key.setdefault(key, item)
+        if not title:
+            return
+        entry_id = len(self._items)
+        tokens = title_tokens(title)
+        self._titles.append(title)
+        self._items.append(item)
+        self._token_sets.append(tokens)
+
+        self._exact.setdefault(title, entry_id)
+        self._exact.setdefault(normalize_title(title), entry_id)
+        self._folded.setdefault(normalize_title(title).casefold(), entry_id)
+        if tokens:
+            self._by_tokens.setdefault(tokens, entry_id)
+        for token in tokens:
+            self._postings.setdefault(token, []).append(entry_id)
+
+    def get(self, key):
+        """Return the page registered under key (e.g. a URL slug), or None."""
+        return self._by_key.get(key)
+
+    def find_exact(self, title):
+        """Find a page whose title matches exactly (ignoring extra whitespace)."""
+        for key in (title, normalize_title(title)):
+            if key in self._exact:
+                return self._items[self._exact[key]]
+        return None
+
+    def find_folded(self, title):
+        """Find a page whose title matches ignoring case."""
+        entry_id = self._folded.get(normalize_title(title).casefold())
+        return self._items[entry_id] if entry_id is not None else None
+
+    def find_token_set(self, title):
+        """Find a page whose title has exactly the same words, in any order."""
+        tokens = title_tokens(title)
+        entry_id = self._by_tokens.get(tokens) if tokens else None
+        return self._items[entry_id] if entry_id is not None else None
+
+    def find(self, title):
+        """Find a page by exact, case-folded, then token-set title match."""
+        if not title:
+            return None
+        for finder in (self.find_exact, self.find_folded, self.find_token_set):
+            item = finder(title)
+            if item is not None:
+                return item
+        return None
+
+    def _candidates(self, tokens):
+        """Return ids of pages sharing at least one token, in index order."""
+        candidate_ids = set()
+        for token in tokens:
+            candidate_ids.update(self._postings.get(token, ()))
+        return sorted(candidate_ids)
+
+    def find_fuzzy(self, title, min_score=0.5):
+        """Find the page with the best word overlap (Jaccard) above min_score."""
+        tokens = title_tokens(title)
+        best_id = None
+        best_score = 0
+        for entry_id in self._candidates(tokens):
+            page_tokens = self._token_sets[entry_id]
+            score = len(tokens & page_tokens) / len(tokens | page_tokens)
+            if score > min_score and score > best_score:
+                best_score = score
+                best_id = entry_id
+        return self._items[best_id] if best_id is not None else None
+
+    def find_partial(self, title, min_coverage=0.5):
+        """Find a page whose title contains (or is contained in) the query.
+
+        At least min_coverage of the query's words must also appear in the
+        page title, which filters out short accidental substrings.
+        """
+        title_folded = normalize_title(title).casefold()
+        tokens = title_tokens(title)
+        if not title_folded or not tokens:
+            return None
+        for entry_id in self._candidates(tokens):
+            page_folded = normalize_title(self._titles[entry_id]).casefold()
+            if title_folded in page_folded or page_folded in title_folded:
+                coverage = len(tokens & self._token_sets[entry_id]) / len(tokens)
+                if coverage >= min_coverage:
+                    return self._items[entry_id]
+        return None
+
+_course_indexes = {}
+_course_indexes_lock = threading.Lock()
+
+def get_course_page_index(course, include_body=False):
+    """Return the PageIndex for a course, listing its pages on first use only.
+
+    An index built with bodies also serves callers that do not need them.
+    """
+    course_key = getattr(course, 'id', id(course))
+    with _course_indexes_lock:
+        if (course_key, True) in _course_indexes:
+            return _course_indexes[(course_key, True)]
+        key = (course_key, include_body)
+        if key not in _course_indexes:
+            _course_indexes[key] = PageIndex.from_course(course, include_body=include_body)
+        return _course_indexes[key]
+
+class RateLimiter:
+    """Adaptive throttle driven by Canvas's X-Rate-Limit-Remaining header.
+
+    Canvas gives each token a request-cost bucket (700 units when full) and
+    reports what is left on every response. While the bucket is above
+    low_water no delay is added; below it the delay before each request
+    doubles, and it halves again once the bucket refills.
+    """
+
+    def __init__(self, low_water=150.0, base_delay=0.25, max_delay=8.0):
+        self.low_water = low_water
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.remaining = None
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, response, *args, **kwargs):
+        """requests response hook: update the delay from the rate-limit header."""
+        header = response.headers.get('X-Rate-Limit-Remaining')
+        with self._lock:
+            if header is not None:
+                try:
+                    self.remaining = float(header)
+                except ValueError:
+                    pass
+            throttled = response.status_code == 429 or (
+                response.status_code == 403 and 'Rate Limit Exceeded' in response.text)
+            if throttled or (self.remaining is not None and self.remaining < self.low_water):
+                self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+            elif self.delay:
+                self.delay = self.delay / 2 if self.delay / 2 >= self.base_delay else 0.0
+        return response
+
+    def wait(self):
+        """Sleep for the current delay (with jitter) before issuing a request."""
+        delay = self.delay
+        if delay:
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def backoff(self, attempt):
+        """Sleep after a rate-limited request, growing with each attempt."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        time.sleep(max(delay, self.delay) * random.uniform(0.5, 1.0))
+
+def _canvas_session(canvas):
+    """The requests session canvasapi uses for canvas, or None.
+
+    canvasapi keeps its requester private, so this may stop finding it.
+    """
+    requester = getattr(canvas, '_Canvas__requester', None)
+    return getattr(requester, '_session', None)
+
+def use_pooled_session(canvas):
+    """Give canvas's HTTP session the shared client's pooled, retrying adapters.
+
+    See http_client.configure_session; returns canvas.
+    """
+    session = _canvas_session(canvas)
+    if session is not None:
+        configure_session(session)
+    return canvas
+
+def attach_rate_limiter(canvas, limiter=None):
+    """Register a RateLimiter on the HTTP session canvasapi uses for canvas.
+
+    Returns the limiter. If the session cannot be found the limiter only
+    paces requests via wait().
+    """
+    limiter = limiter or RateLimiter()
+    session = _canvas_session(canvas)
+    if session is not None:
+        session.hooks.setdefault('response', []).append(limiter.observe)
+    return limiter
+
+def is_rate_limit_error(error):
+    """Return True if a canvasapi exception is Canvas refusing a throttled request."""
+    return 'Rate Limit Exceeded' in str(error)
+
+def fetch_concurrently(fetch, jobs, max_workers=4, limiter=None, retries=4):
+    """Run fetch(job) for each job on a bounded thread pool.
+
+    Yields (job, result, error) tuples in the same order as jobs, so callers
+    can write output deterministically while later fetches are still running.
+    Rate-limited calls are retried with backoff; other exceptions are
+    returned as error rather than raised.
+    """
+    limiter = limiter or RateLimiter()
+
+    def run(job):
+        for attempt in range(retries + 1):
+            limiter.wait()
+            try:
+                return job, fetch(job), None
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < retries:
+                    limiter.backoff(attempt)
+                    continue
+                return job, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        yield from executor.map(run, jobs)
+
+def body_hash(body):
+    """Return the SHA-256 hex digest of a page body."""
+    return hashlib.sha256((body or '').encode('utf-8')).hexdigest()
+
+class SyncManifest:
+    """Record of the Canvas page revision each local HTML file was built from.
+
+    Stored as JSON keyed by page URL slug:
+        {"pages": {"course-orientation": {"title": ..., "updated_at": ...,
+                                          "body_sha256": ..., "path": ...}}}
+    Paths are relative to the course directory.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pages = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.pages = json.load(f).get('pages', {})
+            except (ValueError, OSError) as e:
+                print(f"⚠️  Ignoring unreadable sync manifest {self.path.name}: {e}")
+
+    def is_current(self, slug, updated_at, local_path):
+        """Return True if local_path was built from this revision of the page."""
+        entry = self.pages.get(slug)
+        return (entry is not None
+                and entry.get('updated_at') == str(updated_at)
+                and entry.get('path') == str(local_path))
+
+    def body_unchanged(self, slug, body, local_path):
+        """Return True if local_path was built from exactly this page body."""
+        entry = self.pages.get(slug)
+        return (entry is not None
+                and entry.get('body_sha256') == body_hash(body)
+                and entry.get('path') == str(local_path))
+
+    def record(self, page, body, local_path):
+        """Remember that local_path now reflects this page revision."""
+        self.pages[page.url] = {
+            'title': page.title,
+            'updated_at': str(getattr(page, 'updated_at', '')),
+            'body_sha256': body_hash(body),
+            'path': str(local_path),
+        }
+
+    def save(self):
+        """Write the manifest back to disk."""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'pages': dict(sorted(self.pages.items()))}, f, indent=2, ensure_ascii=False)
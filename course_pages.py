@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Parse-once model of the local course HTML pages.
+
+Several scripts read the same facts out of every page: the Canvas URL in
+<div class="original-link">, the <title>, the <h1> of <div class="guide">,
+the Learning Activities list, and the text elements under .user_content.
+CoursePage pulls all of them out of a single parse. CoursePageCache keeps
+the models in memory for the run and in a JSON file between runs, keyed by
+each file's modification time and size, so regenerating every artifact
+costs one parse per page that actually changed.
+"""
+
+import json
+import os
+import re
+import tempfile
+from html import unescape
+from pathlib import Path
+
+from html_changes import BLOCK_TAGS
+from html_parsing import load_html
+
+LEARNING_ACTIVITIES = 'Learning Activities'
+
+def _stripped_text(tag):
+    return tag.get_text().strip() if tag else None
+
+def _activity_title(link):
+    """Title of one Learning Activities link, without "| Video (6:02) | Guide"."""
+    title = link.get('title', '')
+    if not title:
+        # Try to get text from strong tag or link text
+        strong = link.find('strong')
+        if strong:
+            title = strong.get_text().strip()
+        else:
+            title = link.get_text().strip()
+    title = re.sub(r'\s*\|\s*.*$', '', title).strip()
+    return unescape(title)
+
+def _activity_titles(ul):
+    titles = []
+    for li in ul.find_all('li', recursive=False):
+        link = li.find('a')
+        if link:
+            titles.append(_activity_title(link))
+    return titles
+
+def find_learning_activities(soup):
+    """Titles listed under the page's Learning Activities heading.
+
+    The heading is normally an <h2>; the list is the next <ul> beside it,
+    beside its parent <div>, inside that <div>, or anywhere after it. Older
+    pages use a <p> instead, with the list in the following <div>.
+    """
+    learning_activities = []
+
+    for h2 in soup.find_all('h2'):
+        if h2.get_text().strip() != LEARNING_ACTIVITIES:
+            continue
+        next_ul = h2.find_next_sibling('ul')
+        parent = h2.parent
+        if not next_ul and parent and parent.name == 'div':
+            next_ul = parent.find_next_sibling('ul')
+        if not next_ul and parent:
+            next_ul = parent.find('ul')
+        if not next_ul:
+            for sibling in h2.next_siblings:
+                if hasattr(sibling, 'name') and sibling.name == 'ul':
+                    next_ul = sibling
+                    break
+        if next_ul:
+            learning_activities.extend(_activity_titles(next_ul))
+
+    if not learning_activities:
+        for p in soup.find_all('p'):
+            if LEARNING_ACTIVITIES not in p.get_text():
+                continue
+            next_ul = p.find_next_sibling('ul')
+            parent = p.parent
+            if not next_ul and parent and parent.name == 'div':
+                next_div = parent.find_next_sibling('div')
+                if next_div:
+                    next_ul = next_div.find('ul')
+                if not next_ul:
+                    next_ul = parent.find_next_sibling('ul')
+            if next_ul:
+                learning_activities.extend(_activity_titles(next_ul))
+            break
+
+    return learning_activities
+
+class CoursePage:
+    """What the scripts read from one course HTML page.
+
+    title is the stripped <title> text and canvas_url the href of the
+    original-link anchor (None when missing). guide_h1 is the <h1> in
+    <div class="guide"> and h1 the first <h1> anywhere. elements is the
+    user_content element table: one {'index', 'tag', 'text'} per non-empty
+    BLOCK_TAGS element, where index counts every BLOCK_TAGS element in
+    document order (the numbering DOCX-HTML mappings use); it is None if
+    the page has no .user_content. Pages are parsed with the round-trip
+    parser, so the element table numbers the same tree the mapping
+    appliers in html_changes edit (parsers disagree on malformed markup).
+    """
+
+    def __init__(self, title=None, canvas_url=None, guide_h1=None, h1=None,
+                 learning_activities=(), elements=None):
+        self.title = title
+        self.canvas_url = canvas_url
+        self.guide_h1 = guide_h1
+        self.h1 = h1
+        self.learning_activities = list(learning_activities)
+        self.elements = elements
+
+    @classmethod
+    def from_soup(cls, soup):
+        canvas_url = None
+        original_link = soup.find('div', class_='original-link')
+        if original_link:
+            a_tag = original_link.find('a')
+            if a_tag and 'href' in a_tag.attrs:
+                canvas_url = a_tag['href']
+
+        guide_div = soup.find('div', class_='guide')
+        guide_h1 = guide_div.find('h1') if guide_div else None
+
+        elements = None
+        user_content = soup.find('div', class_='user_content')
+        if user_content:
+            elements = []
+            for index, element in enumerate(user_content.find_all(BLOCK_TAGS)):
+                text = element.get_text().strip()
+                if text:
+                    elements.append({'index': index, 'tag': element.name, 'text': text})
+
+        return cls(_stripped_text(soup.find('title')), canvas_url, _stripped_text(guide_h1),
+                   _stripped_text(soup.find('h1')), find_learning_activities(soup), elements)
+
+    @classmethod
+    def parse(cls, html_file_path):
+        """Read and parse one HTML file."""
+        return cls.from_soup(load_html(html_file_path, round_trip=True))
+
+    def link_text(self, fallback):
+        """Guide <h1>, else the first <h1>, else fallback (e.g. the file stem)."""
+        if self.guide_h1 is not None:
+            return self.guide_h1
+        if self.h1 is not None:
+            return self.h1
+        return fallback
+
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'canvas_url': self.canvas_url,
+            'guide_h1': self.guide_h1,
+            'h1': self.h1,
+            'learning_activities': self.learning_activities,
+            'elements': self.elements,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+class CoursePageCache:
+    """CoursePages by file, reparsed only when a file's mtime or size changes.
+
+    With a cache_file the models are loaded from it on first use and
+    written back by save(); without one they only live for this run.
+    """
+
+    # 2: pages are parsed with the round-trip parser, not the read-only one
+    CACHE_VERSION = 2
+
+    def __init__(self, cache_file=None):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._entries = None
+        self._pages = {}
+        self._dirty = False
+
+    def _load(self):
+        self._entries = {}
+        if not self.cache_file:
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('version') == self.CACHE_VERSION:
+                self._entries = cached['pages']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, html_file_path):
+        """The CoursePage for a file, parsing it only if it changed.
+
+        Raises OSError if the file cannot be read.
+        """
+        if self._entries is None:
+            self._load()
+        key = str(Path(html_file_path).resolve())
+        stat = os.stat(key)
+        entry = self._entries.get(key)
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            page = self._pages.get(key)
+            if page is None:
+                page = self._pages[key] = CoursePage.from_dict(entry['page'])
+            return page
+
+        page = self._pages[key] = CoursePage.parse(key)
+        self._entries[key] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'page': page.to_dict()}
+        self._dirty = True
+        return page
+
+    def save(self):
+        """Write the cache file if any page was parsed since it was loaded."""
+        if not (self.cache_file and self._dirty):
+            return
+        # Forget files that no longer exist
+        entries = {key: entry for key, entry in self._entries.items() if os.path.exists(key)}
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_file.parent,
+                                             prefix='.tmp-', suffix='.json', delete=False) as tmp:
+                json.dump({'version': self.CACHE_VERSION, 'pages': entries}, tmp, ensure_ascii=False)
+            os.replace(tmp.name, self.cache_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"  ⚠️  Could not write page cache: {e}")
@@ -6,11 +6,15 @@ Link text comes from <h1> in <div class="guide"> of each HTML file.
 
 import re
 from pathlib import Path
-from bs4 import BeautifulSoup
+
+from course_pages import CoursePageCache
 
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 MAPPING_FILE = COURSE_DIR / "DOCX-HTML-MAPPING.md"
 OUTPUT_FILE = COURSE_DIR / "Canvas-Course-DOCX-Editor.md"
+PAGE_CACHE_FILE = COURSE_DIR / ".course-page-cache.json"
+
+_page_cache = CoursePageCache(PAGE_CACHE_FILE)
 
 def extract_box_url_from_markdown_link(markdown_link):
     """Extract Box Office Online URL from markdown link."""
@@ -22,24 +26,8 @@ def extract_box_url_from_markdown_link(markdown_link):
 def extract_h1_from_guide(html_file_path):
     """Extract <h1> text from <div class="guide"> in HTML file."""
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        soup = BeautifulSoup(content, 'html.parser')
-        guide_div = soup.find('div', class_='guide')
-
-        if guide_div:
-            h1 = guide_div.find('h1')
-            if h1:
-                return h1.get_text().strip()
-
-        # Fallback: try to find any h1 in the document
-        h1 = soup.find('h1')
-        if h1:
-            return h1.get_text().strip()
-
-        # Last fallback: use filename
-        return html_file_path.stem
+        # Falls back to any <h1> in the document, then to the filename
+        return _page_cache.get(html_file_path).link_text(html_file_path.stem)
     except Exception as e:
         print(f"  ⚠️  Error reading {html_file_path.name}: {e}")
         return html_file_path.stem
@@ -102,6 +90,7 @@ def main():
             print(f"   ✅ {html_path.name}: '{h1_text}'")
         else:
             print(f"   ⚠️  File not found: {html_path}")
+    _page_cache.save()
 
     # Create markdown file
     print(f"\n📄 Creating {OUTPUT_FILE.name}...")
@@ -8,15 +8,16 @@ to the correct locations in the HTML file.
 
 import argparse
 import json
-import zipfile
-import io
-import xml.etree.ElementTree as ET
 from pathlib import Path
-from bs4 import BeautifulSoup
-import requests
+
+from box_files import BoxFileCache, download_file_cached, download_file_content
+from course_pages import CoursePageCache
+from docx_document import DOCX_CACHE_DIR, DocxDocument
+from docx_html_alignment import align_structures
 
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
-BOX_API_BASE = "https://api.box.com/2.0"
+BOX_CACHE_DIR = COURSE_DIR / ".box-cache"
+PAGE_CACHE_FILE = COURSE_DIR / ".course-page-cache.json"
 
 def get_box_access_token():
     """Get Box access token from config."""
@@ -33,41 +34,32 @@ def get_box_access_token():
                 return config.get('developer_token')
     return os.getenv('BOX_DEVELOPER_TOKEN')
 
-def download_docx_from_box(file_id, access_token):
-    """Download DOCX file from Box."""
-    headers = {'Authorization': f'Bearer {access_token}'}
-    content_url = f'{BOX_API_BASE}/files/{file_id}/content'
-    response = requests.get(content_url, headers=headers, stream=True)
-    response.raise_for_status()
-    return response.content
+def download_docx_from_box(file_id, access_token, use_cache=True):
+    """Download DOCX file from Box as a seekable (spooled) file object.
+
+    With use_cache, an unchanged file is served from BOX_CACHE_DIR. The
+    caller closes the returned file.
+    """
+    if not use_cache:
+        docx_file, _ = download_file_content(file_id, access_token)
+        return docx_file
+    docx_file, _, _ = download_file_cached(file_id, access_token, BoxFileCache(BOX_CACHE_DIR))
+    return docx_file
 
 def extract_docx_structure(docx_content):
     """Extract paragraph structure from DOCX file."""
     structure = []
 
-    with zipfile.ZipFile(io.BytesIO(docx_content)) as docx:
-        document_xml = docx.read('word/document.xml')
-        root = ET.fromstring(document_xml)
-
-        namespaces = {
-            'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
-        }
-
-        # Extract all paragraphs with their text and position
-        for idx, para in enumerate(root.findall('.//w:p', namespaces)):
-            # Extract all text from this paragraph
-            texts = []
-            for t_elem in para.findall('.//w:t', namespaces):
-                if t_elem.text:
-                    texts.append(t_elem.text)
-
-            para_text = ' '.join(texts).strip()
-            if para_text:  # Only include non-empty paragraphs
-                structure.append({
-                    'index': idx,
-                    'text': para_text,
-                    'text_hash': hash(para_text[:100])  # Hash for matching
-                })
+    # Same cached analysis (and paragraph numbering) the update scripts use
+    document = DocxDocument.load(docx_content, DOCX_CACHE_DIR)
+    for para in document.paragraphs:
+        para_text = para.text.strip()
+        if para_text:  # Only include non-empty paragraphs
+            structure.append({
+                'index': para.index,
+                'text': para_text,
+                'text_hash': hash(para_text[:100])  # Hash for matching
+            })
 
     return structure
 
@@ -75,102 +67,45 @@ def extract_html_structure(html_file_path):
     """Extract paragraph structure from HTML file."""
     structure = []
 
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-    user_content = soup.find('div', class_='user_content')
+    # Non-empty p, div, li and heading elements of .user_content, indexed
+    # over all of them: the page's (cached) CoursePage element table
+    page_cache = CoursePageCache(PAGE_CACHE_FILE)
+    elements = page_cache.get(html_file_path).elements
+    page_cache.save()
 
-    if not user_content:
+    if elements is None:
         raise ValueError("Could not find .user_content div in HTML file")
 
-    # Extract all text elements (p, div, li, headings) with their text
-    for idx, element in enumerate(user_content.find_all(['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])):
-        element_text = element.get_text().strip()
-        if element_text:  # Only include non-empty elements
-            structure.append({
-                'index': idx,
-                'tag': element.name,
-                'text': element_text,
-                'text_hash': hash(element_text[:100]),  # Hash for matching
-                'element_id': f"elem_{idx}"  # For later reference
-            })
-
-    return structure, soup, user_content
-
-def normalize_text(text):
-    """Normalize text for comparison (remove extra whitespace, lowercase, etc.)."""
-    import re
-    # Remove extra whitespace, normalize to lowercase
-    text = re.sub(r'\s+', ' ', text.lower().strip())
-    # Remove HTML entities that might be in HTML but not DOCX
-    text = text.replace('&amp;', '&').replace('&nbsp;', ' ')
-    return text
+    for element in elements:
+        idx = element['index']
+        structure.append({
+            'index': idx,
+            'tag': element['tag'],
+            'text': element['text'],
+            'text_hash': hash(element['text'][:100]),  # Hash for matching
+            'element_id': f"elem_{idx}"  # For later reference
+        })
 
-def calculate_similarity(text1, text2):
-    """Calculate similarity between two texts (0-1)."""
-    norm1 = normalize_text(text1)
-    norm2 = normalize_text(text2)
-
-    if not norm1 or not norm2:
-        return 0.0
-
-    # Exact match
-    if norm1 == norm2:
-        return 1.0
-
-    # Substring match
-    if norm1 in norm2 or norm2 in norm1:
-        return 0.8
-
-    # Word overlap
-    words1 = set(norm1.split())
-    words2 = set(norm2.split())
-    if words1 and words2:
-        overlap = len(words1 & words2)
-        total = len(words1 | words2)
-        if total > 0:
-            return overlap / total
-
-    return 0.0
+    return structure
 
 def create_mapping(docx_structure, html_structure):
-    """Create mapping between DOCX paragraphs and HTML elements."""
-    mapping = []
+    """Create mapping between DOCX paragraphs and HTML elements.
 
-    # Use a more flexible matching algorithm
-    # Try to match each DOCX paragraph to the best HTML element
-
-    for docx_para in docx_structure:
-        best_match = None
-        best_score = 0.0
-        best_html_idx = -1
-
-        # Search through HTML elements to find best match
-        for html_idx, html_elem in enumerate(html_structure):
-            # Skip if already mapped
-            if any(m['html_index'] == html_elem['index'] for m in mapping):
-                continue
-
-            # Calculate similarity
-            score = calculate_similarity(docx_para['text'], html_elem['text'])
-
-            if score > best_score and score >= 0.3:  # Minimum threshold
-                best_score = score
-                best_match = html_elem
-                best_html_idx = html_idx
-
-        # If we found a good match, add it to mapping
-        if best_match and best_score >= 0.3:
-            mapping.append({
-                'docx_index': docx_para['index'],
-                'docx_text_preview': docx_para['text'][:100],
-                'html_index': best_match['index'],
-                'html_tag': best_match['tag'],
-                'html_text_preview': best_match['text'][:100],
-                'html_element_id': best_match['element_id'],
-                'similarity_score': round(best_score, 3)
-            })
+    Both structures are in reading order, so the mapping is their
+    order-preserving alignment (see docx_html_alignment): each paragraph
+    maps to at most one element and no element is used twice.
+    """
+    mapping = []
+    for docx_para, html_elem, score in align_structures(docx_structure, html_structure):
+        mapping.append({
+            'docx_index': docx_para['index'],
+            'docx_text_preview': docx_para['text'][:100],
+            'html_index': html_elem['index'],
+            'html_tag': html_elem['tag'],
+            'html_text_preview': html_elem['text'][:100],
+            'html_element_id': html_elem['element_id'],
+            'similarity_score': round(score, 3)
+        })
 
     return mapping
 
@@ -179,6 +114,7 @@ def main():
     parser.add_argument('--box-file-id', required=True, help='Box file ID of the DOCX document')
     parser.add_argument('--html-file', required=True, help='Path to HTML file (relative to COURSE_DIR)')
     parser.add_argument('--output', default=None, help='Output JSON file for mapping (default: html_file.mapping.json)')
+    parser.add_argument('--no-cache', action='store_true', help='Always download the DOCX instead of reusing an unchanged cached copy')
 
     args = parser.parse_args()
 
@@ -189,17 +125,17 @@ def main():
 
     # Download DOCX
     print(f"📥 Downloading DOCX from Box (file_id: {args.box_file_id})...")
-    docx_content = download_docx_from_box(args.box_file_id, access_token)
-    print("✅ DOCX downloaded")
+    with download_docx_from_box(args.box_file_id, access_token, use_cache=not args.no_cache) as docx_content:
+        print("✅ DOCX downloaded")
 
-    # Extract structures
-    print("🔍 Extracting DOCX structure...")
-    docx_structure = extract_docx_structure(docx_content)
+        # Extract structures
+        print("🔍 Extracting DOCX structure...")
+        docx_structure = extract_docx_structure(docx_content)
     print(f"   Found {len(docx_structure)} paragraphs in DOCX")
 
     html_file_path = COURSE_DIR / args.html_file
     print(f"🔍 Extracting HTML structure from {html_file_path}...")
-    html_structure, soup, user_content = extract_html_structure(html_file_path)
+    html_structure = extract_html_structure(html_file_path)
     print(f"   Found {len(html_structure)} elements in HTML")
 
     # Create mapping
@@ -8,7 +8,10 @@ import re
 import json
 from pathlib import Path
 from html import escape
-from bs4 import BeautifulSoup
+
+from canvas_pages import PageIndex
+from course_pages import CoursePageCache
+from incremental_write import UNCHANGED, write_if_changed
 
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 MAPPING_FILE = COURSE_DIR / "DOCX-HTML-MAPPING.md"
@@ -16,6 +19,9 @@ BOX_FILE_IDS_JSON = COURSE_DIR / "box-file-ids.json"
 CANVAS_LINKS_JSON = COURSE_DIR / "canvas-page-links.json"
 OUTPUT_FILE = COURSE_DIR / "docs" / "index.html"
 HTML_DIR = COURSE_DIR / "WINTER 25-26 COURSE UPDATES"
+PAGE_CACHE_FILE = COURSE_DIR / ".course-page-cache.json"
+
+_page_cache = CoursePageCache(PAGE_CACHE_FILE)
 
 def get_box_file_url(file_id):
     """Get Box file URL (not Office Online)."""
@@ -34,14 +40,7 @@ def extract_canvas_url_from_html(html_file_path):
     if not html_file_path.exists():
         return None
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        soup = BeautifulSoup(content, 'html.parser')
-        original_link = soup.find('div', class_='original-link')
-        if original_link:
-            a_tag = original_link.find('a')
-            if a_tag and 'href' in a_tag.attrs:
-                return a_tag['href']
+        return _page_cache.get(html_file_path).canvas_url
     except Exception as e:
         print(f"  ⚠️  Error reading {html_file_path}: {e}")
     return None
@@ -193,8 +192,12 @@ def format_page_with_links(page_name, canvas_url=None, box_file_id=None, box_url
     # Return with text left-aligned and links floated right
     return f'<span class="page-text">{escape(page_name)}</span> <span class="page-links">{" | ".join(links)}</span>'
 
-def find_canvas_url_for_title(title, canvas_links, title_to_url, module_title=None):
-    """Find Canvas URL for a given title."""
+def find_canvas_url_for_title(title, canvas_links, title_to_url, module_title=None, title_index=None):
+    """Find Canvas URL for a given title.
+
+    title_index is a PageIndex over title_to_url; pass one built in main() so
+    the fuzzy fallback does not rebuild it for every title.
+    """
     title_lower = title.lower().strip()
 
     # Try exact match first (direct title mapping)
@@ -221,28 +224,10 @@ def find_canvas_url_for_title(title, canvas_links, title_to_url, module_title=No
     if normalized_title_no_num in canvas_links:
         return canvas_links[normalized_title_no_num]
 
-    # Try fuzzy matching: check if title contains key words from any Canvas page title
-    title_words = set(re.findall(r'\w+', title_lower))
-    best_match = None
-    best_score = 0
-
-    for canvas_title, canvas_url in title_to_url.items():
-        canvas_words = set(re.findall(r'\w+', canvas_title))
-        if len(title_words) > 0 and len(canvas_words) > 0:
-            # Calculate overlap
-            overlap = len(title_words & canvas_words)
-            total = len(title_words | canvas_words)
-            if total > 0:
-                score = overlap / total
-                # Prefer matches where most words match
-                if score > 0.5 and score > best_score:
-                    best_score = score
-                    best_match = canvas_url
-
-    if best_match:
-        return best_match
-
-    return None
+    # Try fuzzy matching: pick the Canvas page title with the best word overlap
+    if title_index is None:
+        title_index = PageIndex(title_to_url.items())
+    return title_index.find_fuzzy(title_lower, min_score=0.5)
 
 def main():
     print("📝 Creating GitHub Pages HTML site with new format...")
@@ -254,6 +239,7 @@ def main():
     # Load Canvas links
     canvas_links, title_to_url = load_canvas_links()
     print(f"📖 Loaded {len(canvas_links)} Canvas link mappings ({len(title_to_url)} direct title mappings)")
+    title_index = PageIndex(title_to_url.items())
 
     OUTPUT_FILE.parent.mkdir(exist_ok=True)
 
@@ -396,7 +382,7 @@ def main():
                         box_url = get_box_file_url(box_file_id)
 
                     # Find Canvas URL for module
-                    canvas_url = find_canvas_url_for_title(module_name, canvas_links, title_to_url)
+                    canvas_url = find_canvas_url_for_title(module_name, canvas_links, title_to_url, title_index=title_index)
                     if not canvas_url:
                         # Fallback to HTML file extraction
                         html_file = find_html_file_for_section(module_name, None)
@@ -434,7 +420,7 @@ def main():
                     box_url = get_box_file_url(box_file_id)
 
                 # Find Canvas URL
-                canvas_url = find_canvas_url_for_title(section_name, canvas_links, title_to_url, current_module)
+                canvas_url = find_canvas_url_for_title(section_name, canvas_links, title_to_url, current_module, title_index)
                 if not canvas_url:
                     # Fallback to HTML file extraction
                     html_file = find_html_file_for_section(section_name, current_module)
@@ -525,7 +511,7 @@ def main():
                         box_url = get_box_file_url(box_file_id)
 
                     # Find Canvas URL for learning module
-                    canvas_url = find_canvas_url_for_title(link_text, canvas_links, title_to_url, current_module)
+                    canvas_url = find_canvas_url_for_title(link_text, canvas_links, title_to_url, current_module, title_index)
                     if not canvas_url:
                         # Fallback to HTML file extraction
                         html_file = find_html_file_for_section(link_text, current_module)
@@ -565,6 +551,27 @@ def main():
     html_lines.extend([
         '    <script>',
         '        document.addEventListener("DOMContentLoaded", function() {',
+        '            // The API queues each update and answers with a job; poll its',
+        '            // result URL until the update has finished, for at most',
+        '            // MAX_POLLS x 2 seconds (the API fails a job after 5.5 minutes)',
+        '            const POLL_INTERVAL_MS = 2000;',
+        '            const MAX_POLLS = 180;',
+        '            function waitForJob(resultUrl, polls = 0) {',
+        '                return fetch(resultUrl).then(response => {',
+        '                    if (response.status === 202) {',
+        '                        if (polls >= MAX_POLLS) {',
+        '                            return {',
+        '                                success: false,',
+        '                                message: "The update did not finish within 6 minutes. Check the API server log."',
+        '                            };',
+        '                        }',
+        '                        return new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS))',
+        '                            .then(() => waitForJob(resultUrl, polls + 1));',
+        '                    }',
+        '                    return response.json();',
+        '                });',
+        '            }',
+        '            ',
         '            const updateButtons = document.querySelectorAll(".update-canvas-btn");',
         '            updateButtons.forEach(button => {',
         '                button.addEventListener("click", function(e) {',
@@ -614,6 +621,7 @@ def main():
         '                        })',
         '                    })',
         '                    .then(response => response.json())',
+        '                    .then(data => data.job_id ? waitForJob(new URL(data.result_url, apiUrl).href) : data)',
         '                    .then(data => {',
         '                        // Remove loading state',
         '                        this.classList.remove("loading");',
@@ -652,12 +660,16 @@ def main():
         '</html>'
     ])
 
-    # Write output
+    _page_cache.save()
+
+    # Write output (left untouched if nothing changed)
     print(f"💾 Writing to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(html_lines))
+    status = write_if_changed(OUTPUT_FILE, '\n'.join(html_lines))
 
-    print(f"✅ Created GitHub Pages site: {OUTPUT_FILE}")
+    if status == UNCHANGED:
+        print(f"⏭️  GitHub Pages site unchanged: {OUTPUT_FILE}")
+    else:
+        print(f"✅ {status.capitalize()} GitHub Pages site: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     main()
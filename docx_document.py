@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+One parse of a DOCX file, shared by every script that reads it.
+
+DocxDocument.load() opens the zip once, streams word/document.xml with
+docx_revisions.iter_paragraphs and reads styles and comments alongside.
+The analysis is cached by the SHA-1 of the file content, in memory and
+(when a cache directory is given) as JSON on disk, so mapping creation and
+the update scripts share one parse per document version. Paragraph indices
+are the ones iter_paragraphs assigns, so mapping entries and tracked
+changes always agree on what "paragraph N" means.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+
+from box_files import as_seekable
+from docx_revisions import (
+    OUTLINE_LVL_TAG, P_TAG, PPR_TAG, VAL_ATTR, W, DocxParagraph, element_text, iter_paragraphs
+)
+
+# Bump when the analysis format or rules change, to ignore old cache files
+ANALYSIS_VERSION = 1
+MEMORY_CACHE_SIZE = 8
+DISK_CACHE_ENTRIES = 64
+# The on-disk cache every script passes to load(), so they all share it
+DOCX_CACHE_DIR = Path(__file__).parent / ".docx-cache"
+HEADING_STYLE_PATTERN = re.compile(r'heading\s*(\d)', re.IGNORECASE)
+
+_memory_cache = OrderedDict()
+_memory_cache_lock = threading.Lock()
+
+def content_sha1(docx_content):
+    """SHA-1 of DOCX bytes or of a seekable file object's content."""
+    if isinstance(docx_content, (bytes, bytearray)):
+        return hashlib.sha1(docx_content).hexdigest()
+    sha1 = hashlib.sha1()
+    docx_content.seek(0)
+    for chunk in iter(lambda: docx_content.read(1024 * 1024), b''):
+        sha1.update(chunk)
+    docx_content.seek(0)
+    return sha1.hexdigest()
+
+def read_styles(docx):
+    """Paragraph styles from word/styles.xml: id -> name, outline level, basedOn."""
+    if 'word/styles.xml' not in docx.namelist():
+        return {}
+    styles = {}
+    root = ET.fromstring(docx.read('word/styles.xml'))
+    for style in root.iter(W + 'style'):
+        if style.get(W + 'type') != 'paragraph':
+            continue
+        name = style.find(W + 'name')
+        based_on = style.find(W + 'basedOn')
+        outline = style.find(f'{PPR_TAG}/{OUTLINE_LVL_TAG}')
+        styles[style.get(W + 'styleId')] = {
+            'name': name.get(VAL_ATTR) if name is not None else None,
+            'based_on': based_on.get(VAL_ATTR) if based_on is not None else None,
+            'outline_level': int(outline.get(VAL_ATTR, 9)) if outline is not None else None,
+        }
+    return styles
+
+def read_comments(docx):
+    """Comments from word/comments.xml, keyed by comment id."""
+    if 'word/comments.xml' not in docx.namelist():
+        return {}
+    comments = {}
+    root = ET.fromstring(docx.read('word/comments.xml'))
+    for comment in root.iter(W + 'comment'):
+        comment_id = comment.get(W + 'id')
+        comments[comment_id] = {
+            'id': comment_id,
+            'author': comment.get(W + 'author', 'Unknown'),
+            'date': comment.get(W + 'date', ''),
+            'text': '\n'.join(element_text(p, '') for p in comment.iter(P_TAG)).strip(),
+        }
+    return comments
+
+def heading_level(style_id, outline_level, styles):
+    """Heading level (1-9) of a paragraph, or None for body text.
+
+    The paragraph's own w:outlineLvl wins; otherwise the style chain is
+    followed through basedOn looking for a built-in "heading N" style name,
+    then an outline level. (HTML-to-DOCX converters sometimes give
+    "heading 1" an outline level of 1, so the name is trusted first.)
+    """
+    if outline_level is not None:
+        return outline_level + 1 if outline_level < 9 else None
+    seen = set()
+    current = style_id
+    while current and current not in seen and current in styles:
+        seen.add(current)
+        style = styles[current]
+        match = HEADING_STYLE_PATTERN.fullmatch(style['name'] or '')
+        if match:
+            return int(match.group(1))
+        if style['outline_level'] is not None:
+            return style['outline_level'] + 1 if style['outline_level'] < 9 else None
+        current = style['based_on']
+    # No styles.xml entry: fall back to the style id itself (e.g. Heading2)
+    match = HEADING_STYLE_PATTERN.fullmatch(style_id or '')
+    return int(match.group(1)) if match else None
+
+class DocxDocument:
+    """Paragraphs, revisions and comments of one DOCX version.
+
+    blocks is everything iter_paragraphs yielded, in order; paragraphs are
+    the real paragraphs among them (with heading_level set). insertions and
+    deletions list every revision in document order, including ones outside
+    any paragraph. comments maps comment id to author, date and text.
+    """
+
+    def __init__(self, sha1, blocks, comments):
+        self.sha1 = sha1
+        self.blocks = list(blocks)
+        self.comments = comments
+        self.paragraphs = [block for block in self.blocks if block.index is not None]
+        self.insertions = [revision for block in self.blocks for revision in block.insertions]
+        self.deletions = [revision for block in self.blocks for revision in block.deletions]
+
+    @property
+    def text(self):
+        return '\n'.join(paragraph.text for paragraph in self.paragraphs)
+
+    @property
+    def headings(self):
+        return [paragraph for paragraph in self.paragraphs if paragraph.heading_level]
+
+    @classmethod
+    def parse(cls, docx_content, sha1=None):
+        """Analyse a DOCX (bytes or seekable file object) in one pass."""
+        sha1 = sha1 or content_sha1(docx_content)
+        with zipfile.ZipFile(as_seekable(docx_content)) as docx:
+            styles = read_styles(docx)
+            comments = read_comments(docx)
+            with docx.open('word/document.xml') as document_xml:
+                blocks = list(iter_paragraphs(document_xml))
+        for block in blocks:
+            block.heading_level = heading_level(block.style, block.outline_level, styles)
+        return cls(sha1, blocks, comments)
+
+    @classmethod
+    def load(cls, docx_content, cache_dir=None):
+        """Return the analysis of a DOCX, parsing it only if not cached."""
+        sha1 = content_sha1(docx_content)
+        with _memory_cache_lock:
+            if sha1 in _memory_cache:
+                _memory_cache.move_to_end(sha1)
+                return _memory_cache[sha1]
+
+        document = cls._read_cache(cache_dir, sha1) if cache_dir else None
+        if document is None:
+            document = cls.parse(docx_content, sha1)
+            if cache_dir:
+                document._write_cache(cache_dir)
+
+        with _memory_cache_lock:
+            _memory_cache[sha1] = document
+            while len(_memory_cache) > MEMORY_CACHE_SIZE:
+                _memory_cache.popitem(last=False)
+        return document
+
+    def to_dict(self):
+        return {
+            'version': ANALYSIS_VERSION,
+            'sha1': self.sha1,
+            'blocks': [block.to_dict() for block in self.blocks],
+            'comments': self.comments,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['sha1'], [DocxParagraph.from_dict(item) for item in data['blocks']], data['comments'])
+
+    @classmethod
+    def _read_cache(cls, cache_dir, sha1):
+        path = Path(cache_dir) / f'{sha1}.json'
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if data.get('version') != ANALYSIS_VERSION:
+            return None
+        os.utime(path)
+        return cls.from_dict(data)
+
+    def _write_cache(self, cache_dir):
+        cache_dir = Path(cache_dir)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, prefix='.tmp-',
+                                         suffix='.json', delete=False) as tmp:
+            json.dump(self.to_dict(), tmp)
+        os.replace(tmp.name, cache_dir / f'{self.sha1}.json')
+
+        # Keep only the most recently used analyses
+        entries = []
+        for path in cache_dir.glob('[!.]*.json'):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue  # removed by another thread
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        for _, path in entries[DISK_CACHE_ENTRIES:]:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Order-preserving alignment of DOCX paragraphs to course HTML elements.
+
+A page's DOCX and its HTML present the same content in the same reading
+order, so a DOCX-HTML mapping is a monotonic alignment of two sequences:
+if paragraph a comes before paragraph b, a's element comes before b's.
+align_structures() finds the best such alignment with a Gotoh-style
+dynamic program (affine gap penalties, so unmatched stretches cost one
+opening each rather than breaking the page into scattered matches).
+
+Headings whose text occurs exactly once on both sides are anchors. The
+longest chain of anchors in order on both sides fixes points the
+alignment should pass through, and the dynamic program only fills a band
+of cells around the path interpolated between them. For D paragraphs and
+H elements that is O((D + H) x band) similarity checks instead of every
+pair.
+
+Similarity is the score create-docx-html-mapping.py has always used (exact
+1.0, substring 0.8, else word overlap), with two changes. A substring
+match is discounted by how much longer the containing text is, so a short
+paragraph does not map onto a wrapper <div> holding half the page.
+Elements whose text starts with the next element's text (wrappers: in
+find_all order an element's first descendant comes right after it) are
+also discounted while aligning, so the leaf element is preferred when both
+have the same text.
+"""
+
+import math
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+MIN_SIMILARITY = 0.3
+SUBSTRING_SIMILARITY = 0.8
+# Alignment score factor for elements that wrap the element after them
+CONTAINER_FACTOR = 0.9
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+# Extra score for aligning an anchor heading pair
+ANCHOR_BONUS = 0.5
+GAP_OPEN = 0.15
+GAP_EXTEND = 0.01
+# Cells either side of the anchor-interpolated path that are considered
+DEFAULT_BAND = 32
+
+NEG = float('-inf')
+MATCH, SKIP_DOCX, SKIP_HTML = 0, 1, 2
+
+QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"'})
+
+def normalize_text(text):
+    """Lower-case text with curly quotes straightened and whitespace collapsed."""
+    text = text.translate(QUOTES).replace('&amp;', '&').replace('&nbsp;', ' ')
+    return ' '.join(text.lower().split())
+
+def _prepared(structure):
+    texts = [normalize_text(item['text']) for item in structure]
+    return texts, [set(text.split()) for text in texts]
+
+def similarity(text1, words1, text2, words2):
+    """Similarity (0-1) of two normalized texts and their word sets."""
+    if not text1 or not text2:
+        return 0.0
+    if text1 == text2:
+        return 1.0
+    shorter, longer = (text1, text2) if len(text1) <= len(text2) else (text2, text1)
+    if shorter in longer:
+        return SUBSTRING_SIMILARITY * math.sqrt(len(shorter) / len(longer))
+    overlap = len(words1 & words2)
+    return overlap / len(words1 | words2) if overlap else 0.0
+
+def _containers(html_texts):
+    """Positions of elements whose text starts with the next element's text."""
+    return {j for j in range(len(html_texts) - 1)
+            if html_texts[j + 1] and len(html_texts[j]) > len(html_texts[j + 1])
+            and html_texts[j].startswith(html_texts[j + 1])}
+
+def find_anchors(docx_texts, html_texts, html_tags):
+    """Longest in-order chain of (docx position, html position) heading anchors.
+
+    A pair is a candidate when the HTML element is a heading and its text
+    occurs exactly once among the paragraphs and once among the headings.
+    """
+    docx_counts = Counter(docx_texts)
+    headings = defaultdict(list)
+    for j, (text, tag) in enumerate(zip(html_texts, html_tags)):
+        if tag in HEADING_TAGS and text:
+            headings[text].append(j)
+    pairs = [(i, headings[text][0]) for i, text in enumerate(docx_texts)
+             if text and docx_counts[text] == 1 and len(headings.get(text, ())) == 1]
+
+    # Longest increasing subsequence of html positions (pairs are in docx
+    # order): tails[n] ends the chain of length n + 1 with the lowest position
+    tails, tail_positions = [], []
+    previous = [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        n = bisect_left(tail_positions, j)
+        previous[k] = tails[n - 1] if n else None
+        if n == len(tails):
+            tails.append(k)
+            tail_positions.append(j)
+        else:
+            tails[n], tail_positions[n] = k, j
+    chain = []
+    k = tails[-1] if tails else None
+    while k is not None:
+        chain.append(pairs[k])
+        k = previous[k]
+    return chain[::-1]
+
+def _band(anchors, rows, columns, band):
+    """Column range [lo, hi] of each DP row around the anchor path."""
+    points = [(0, 0)] + [(i + 1, j + 1) for i, j in anchors] + [(rows, columns)]
+    centers = []
+    for (r0, c0), (r1, c1) in zip(points, points[1:]):
+        for r in range(r0, r1):
+            centers.append(c0 + (r - r0) * (c1 - c0) / (r1 - r0))
+    centers.append(columns)
+
+    ranges = []
+    for r in range(rows + 1):
+        low = min(centers[max(r - 1, 0)], centers[r])
+        high = max(centers[r], centers[min(r + 1, rows)])
+        ranges.append((max(0, math.floor(low) - band), min(columns, math.ceil(high) + band)))
+    return ranges
+
+def align_structures(docx_structure, html_structure, band=DEFAULT_BAND):
+    """Align DOCX paragraphs to HTML elements in reading order.
+
+    Takes the structures built by create-docx-html-mapping.py (dicts with
+    'text'; HTML ones also 'tag') and returns (docx_item, html_item,
+    similarity) for each aligned pair, in document order. Pairs scoring
+    below MIN_SIMILARITY are never aligned.
+    """
+    docx_texts, docx_words = _prepared(docx_structure)
+    html_texts, html_words = _prepared(html_structure)
+    html_tags = [item.get('tag') for item in html_structure]
+    containers = _containers(html_texts)
+    anchors = find_anchors(docx_texts, html_texts, html_tags)
+    anchor_set = set(anchors)
+    rows, columns = len(docx_structure), len(html_structure)
+    ranges = _band(anchors, rows, columns, band)
+
+    # scores[state][r][j] and the state each cell was reached from
+    scores = [[{} for _ in range(rows + 1)] for _ in range(3)]
+    back = [[{} for _ in range(rows + 1)] for _ in range(3)]
+    matched = {}
+
+    def best_of(r, j, costs):
+        """Best (score, state) at (r, j) after paying costs[state] to leave it."""
+        return max(((scores[state][r].get(j, NEG) - costs[state], state) for state in (MATCH, SKIP_DOCX, SKIP_HTML)),
+                   key=lambda candidate: candidate[0])
+
+    scores[MATCH][0][0] = 0.0
+    for r in range(rows + 1):
+        low, high = ranges[r]
+        for j in range(low, high + 1):
+            if r > 0:
+                # Skip docx paragraph r-1
+                scores[SKIP_DOCX][r][j], back[SKIP_DOCX][r][j] = best_of(
+                    r - 1, j, {MATCH: GAP_OPEN, SKIP_DOCX: GAP_EXTEND, SKIP_HTML: GAP_OPEN})
+                if j > 0:
+                    score = similarity(docx_texts[r - 1], docx_words[r - 1], html_texts[j - 1], html_words[j - 1])
+                    if score >= MIN_SIMILARITY:
+                        previous, state = best_of(r - 1, j - 1, {MATCH: 0.0, SKIP_DOCX: 0.0, SKIP_HTML: 0.0})
+                        if previous > NEG:
+                            gain = score * CONTAINER_FACTOR if j - 1 in containers else score
+                            if (r - 1, j - 1) in anchor_set:
+                                gain += ANCHOR_BONUS
+                            scores[MATCH][r][j], back[MATCH][r][j] = previous + gain, state
+                            matched[(r, j)] = score
+            if j > 0:
+                # Skip html element j-1
+                scores[SKIP_HTML][r][j], back[SKIP_HTML][r][j] = best_of(
+                    r, j - 1, {MATCH: GAP_OPEN, SKIP_DOCX: GAP_OPEN, SKIP_HTML: GAP_EXTEND})
+
+    # Trace the best path back from the end
+    _, state = best_of(rows, columns, {MATCH: 0.0, SKIP_DOCX: 0.0, SKIP_HTML: 0.0})
+    r, j = rows, columns
+    pairs = []
+    while r > 0 or j > 0:
+        previous_state = back[state][r][j]
+        if state == MATCH:
+            pairs.append((docx_structure[r - 1], html_structure[j - 1], matched[(r, j)]))
+            r, j = r - 1, j - 1
+        elif state == SKIP_DOCX:
+            r -= 1
+        else:
+            j -= 1
+        state = previous_state
+    return pairs[::-1]
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for reading tracked changes out of word/document.xml.
+
+RevisionIndex walks the document tree once and records every w:ins and
+w:del together with the paragraph that contains it, so looking up a
+revision's paragraph is a dictionary access instead of a scan over every
+paragraph's subtree. The same walk builds a child-to-parent map (stdlib
+ElementTree has no getparent), and each paragraph's per-child text is
+computed once and shared by every revision in that paragraph.
+
+iter_paragraphs streams word/document.xml with iterparse instead of
+building the whole tree. Each top-level paragraph is indexed and yielded
+as soon as it is complete, then discarded, so memory stays bounded by the
+largest paragraph rather than the document.
+"""
+
+import xml.etree.ElementTree as ET
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+NAMESPACES = {'w': W_NS}
+W = f'{{{W_NS}}}'
+
+BODY_TAG = W + 'body'
+P_TAG = W + 'p'
+INS_TAG = W + 'ins'
+DEL_TAG = W + 'del'
+T_TAG = W + 't'
+PPR_TAG = W + 'pPr'
+PSTYLE_TAG = W + 'pStyle'
+OUTLINE_LVL_TAG = W + 'outlineLvl'
+COMMENT_REFERENCE_TAG = W + 'commentReference'
+VAL_ATTR = W + 'val'
+
+def element_text(elem, separator=' '):
+    """Join the text of every w:t under elem."""
+    return separator.join(t.text for t in elem.iter(T_TAG) if t.text)
+
+class ParagraphText:
+    """Text of a paragraph's direct children, for context lookups.
+
+    Text inside other insertions is left out, as it may not be in the
+    published HTML yet.
+    """
+
+    def __init__(self, paragraph):
+        self.position = {}
+        texts = []
+        for position, child in enumerate(paragraph):
+            self.position[child] = position
+            texts.append('' if child.tag == INS_TAG else element_text(child, ''))
+        self.text = ''.join(texts)
+        # offsets[i] is where child i's text starts in self.text
+        self.offsets = [0]
+        for text in texts:
+            self.offsets.append(self.offsets[-1] + len(text))
+        # next_text[i] is the text of the first child at or after i that has any
+        self.next_text = [''] * (len(texts) + 1)
+        for position in range(len(texts) - 1, -1, -1):
+            self.next_text[position] = texts[position] or self.next_text[position + 1]
+
+    def before(self, position):
+        return self.text[:self.offsets[position]]
+
+    def after(self, position):
+        return self.next_text[position + 1]
+
+class Revision:
+    """A w:ins or w:del element and where it sits in the document.
+
+    text, author and date are read when the revision is indexed, so they
+    survive detach(), which drops the XML references once the paragraph
+    has been processed.
+    """
+
+    def __init__(self, element, paragraph_index, paragraph, parent):
+        self.element = element
+        self.paragraph_index = paragraph_index
+        self.paragraph = paragraph
+        self.parent = parent
+        self.kind = 'insertion' if element.tag == INS_TAG else 'deletion'
+        self.text = element_text(element)
+        self.author = element.get(W + 'author', 'Unknown')
+        self.date = element.get(W + 'date', '')
+        self.before_context = None
+        self.after_context = None
+
+    def detach(self):
+        self.element = self.paragraph = self.parent = None
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'text': self.text,
+            'author': self.author,
+            'date': self.date,
+            'paragraph_index': self.paragraph_index,
+            'before_context': self.before_context,
+            'after_context': self.after_context,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a detached Revision saved with to_dict()."""
+        revision = cls.__new__(cls)
+        revision.element = revision.paragraph = revision.parent = None
+        revision.__dict__.update(data)
+        return revision
+
+class RevisionIndex:
+    """Every w:ins/w:del in a document, indexed by containing paragraph.
+
+    Paragraphs are numbered in document order, the same order as
+    root.findall('.//w:p'), starting from first_paragraph_index. A revision
+    belongs to its outermost enclosing paragraph (a paragraph inside a text
+    box counts as part of the paragraph holding the text box); revisions
+    outside any paragraph get None.
+    """
+
+    def __init__(self, root, first_paragraph_index=0):
+        self.insertions = []
+        self.deletions = []
+        self.paragraph_count = 0
+        self._by_element = {}
+        self._parents = {}
+        self._paragraph_text = {}
+
+        # Iterative pre-order walk: (element, parent, paragraph index, paragraph)
+        stack = [(root, None, None, None)]
+        while stack:
+            elem, parent, para_index, para = stack.pop()
+            self._parents[elem] = parent
+            tag = elem.tag
+            if tag == P_TAG and para is None:
+                para_index, para = first_paragraph_index + self.paragraph_count, elem
+            if tag == P_TAG:
+                self.paragraph_count += 1
+            elif tag == INS_TAG or tag == DEL_TAG:
+                revision = Revision(elem, para_index, para, parent)
+                self._by_element[elem] = revision
+                (self.insertions if tag == INS_TAG else self.deletions).append(revision)
+            stack.extend((child, elem, para_index, para) for child in reversed(elem))
+
+    def __getitem__(self, elem):
+        return self._by_element[elem]
+
+    def paragraph_index_of(self, elem):
+        """Paragraph index of a w:ins/w:del element, or None."""
+        revision = self._by_element.get(elem)
+        return revision.paragraph_index if revision else None
+
+    def paragraph_of(self, elem):
+        """Paragraph element containing a w:ins/w:del element, or None."""
+        revision = self._by_element.get(elem)
+        return revision.paragraph if revision else None
+
+    def parent(self, elem):
+        """Parent element of elem, or None for the root."""
+        return self._parents.get(elem)
+
+    def paragraph_text(self, paragraph):
+        """Cached ParagraphText for a paragraph element."""
+        text = self._paragraph_text.get(paragraph)
+        if text is None:
+            text = self._paragraph_text[paragraph] = ParagraphText(paragraph)
+        return text
+
+    def context_around(self, elem, context_length=100):
+        """Text before and after a revision within its paragraph.
+
+        The context is the paragraph text up to the revision and the text of
+        the next child that has any, trimmed to context_length characters.
+        A revision nested below a paragraph child (a hyperlink, a text box)
+        is placed at that child. Returns (None, None) outside a paragraph.
+        """
+        paragraph = self.paragraph_of(elem)
+        if paragraph is None:
+            return None, None
+
+        anchor = elem
+        while self._parents.get(anchor) is not paragraph:
+            anchor = self._parents[anchor]
+        text = self.paragraph_text(paragraph)
+        position = text.position[anchor]
+
+        before_text = text.before(position).strip()
+        if len(before_text) > context_length:
+            before_text = '...' + before_text[-context_length:]
+
+        after_text = text.after(position).strip()
+        if len(after_text) > context_length:
+            after_text = after_text[:context_length] + '...'
+
+        return before_text, after_text
+
+class DocxParagraph:
+    """A paragraph yielded by iter_paragraphs.
+
+    text joins every w:t in the paragraph (including nested text-box
+    paragraphs) with spaces. insertions and deletions are detached
+    Revisions; insertions carry before_context/after_context. Revisions
+    always belong to the outermost paragraph, so nested paragraphs have none.
+    style is the w:pStyle id, outline_level the paragraph's own
+    w:outlineLvl, and comment_ids the w:commentReference ids it contains.
+    heading_level is filled in by docx_document, which knows the styles.
+    """
+
+    def __init__(self, index, text, insertions=(), deletions=(), style=None,
+                 outline_level=None, comment_ids=(), heading_level=None):
+        self.index = index
+        self.text = text
+        self.insertions = list(insertions)
+        self.deletions = list(deletions)
+        self.style = style
+        self.outline_level = outline_level
+        self.comment_ids = list(comment_ids)
+        self.heading_level = heading_level
+
+    def to_dict(self):
+        return {
+            'index': self.index,
+            'text': self.text,
+            'insertions': [revision.to_dict() for revision in self.insertions],
+            'deletions': [revision.to_dict() for revision in self.deletions],
+            'style': self.style,
+            'outline_level': self.outline_level,
+            'comment_ids': self.comment_ids,
+            'heading_level': self.heading_level,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data['insertions'] = [Revision.from_dict(item) for item in data['insertions']]
+        data['deletions'] = [Revision.from_dict(item) for item in data['deletions']]
+        return cls(**data)
+
+    @classmethod
+    def from_element(cls, index, paragraph, insertions=(), deletions=()):
+        style = outline_level = None
+        properties = paragraph.find(PPR_TAG)
+        if properties is not None:
+            style_elem = properties.find(PSTYLE_TAG)
+            if style_elem is not None:
+                style = style_elem.get(VAL_ATTR)
+            outline_elem = properties.find(OUTLINE_LVL_TAG)
+            if outline_elem is not None:
+                outline_level = int(outline_elem.get(VAL_ATTR, 9))
+        comment_ids = [ref.get(W + 'id') for ref in paragraph.iter(COMMENT_REFERENCE_TAG)]
+        return cls(index, element_text(paragraph), insertions, deletions,
+                   style, outline_level, comment_ids)
+
+def _index_paragraph(paragraph, first_index, context):
+    """DocxParagraphs for a complete top-level w:p and its nested paragraphs."""
+    revisions = RevisionIndex(paragraph, first_index)
+    if context:
+        for revision in revisions.insertions:
+            revision.before_context, revision.after_context = revisions.context_around(revision.element)
+    for revision in revisions.insertions + revisions.deletions:
+        revision.detach()
+
+    for offset, para in enumerate(paragraph.iter(P_TAG)):
+        if offset == 0:
+            yield DocxParagraph.from_element(first_index, para, revisions.insertions, revisions.deletions)
+        else:
+            yield DocxParagraph.from_element(first_index + offset, para)
+
+def iter_paragraphs(source, revisions=True, context=True):
+    """Stream word/document.xml, yielding a DocxParagraph per w:p in order.
+
+    source is a path or a binary file object (e.g. ZipFile.open()).
+    Revisions outside any paragraph, such as table-row insertions, are
+    yielded in a DocxParagraph with index None and empty text at the point
+    where they end. Callers that only need paragraph text can pass
+    revisions=False; context=False skips the before/after context.
+    """
+    body = None
+    open_paragraphs = 0
+    next_index = 0
+    first_index = 0
+    has_revisions = False
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == P_TAG:
+                if not open_paragraphs:
+                    first_index = next_index
+                    has_revisions = False
+                open_paragraphs += 1
+                next_index += 1
+            elif tag == BODY_TAG:
+                body = elem
+            continue
+
+        if tag == P_TAG:
+            open_paragraphs -= 1
+            if open_paragraphs:
+                continue
+            if revisions and has_revisions:
+                yield from _index_paragraph(elem, first_index, context)
+            elif next_index - first_index > 1:
+                for offset, para in enumerate(elem.iter(P_TAG)):
+                    yield DocxParagraph.from_element(first_index + offset, para)
+            else:
+                # Plain paragraph: nothing to index
+                yield DocxParagraph.from_element(first_index, elem)
+            elem.clear()
+        elif open_paragraphs:
+            if tag == INS_TAG or tag == DEL_TAG:
+                has_revisions = True
+            continue
+        elif revisions and (tag == INS_TAG or tag == DEL_TAG):
+            revision = Revision(elem, None, None, None)
+            revision.detach()
+            kind = 'insertions' if revision.kind == 'insertion' else 'deletions'
+            yield DocxParagraph(None, '', **{kind: [revision]})
+
+        # Once a top-level block (paragraph, table, ...) is complete, drop
+        # it so the tree never holds more than the block being read
+        if body is not None and len(body) and body[-1] is elem:
+            del body[:]
@@ -9,6 +9,8 @@ the actual page content from Canvas API and replaces the redirect files.
 import os
 import sys
 import re
+import json
+from functools import partial
 from pathlib import Path
 from html import escape
 
@@ -18,10 +20,27 @@ sys.path.insert(0, '/Users/a00288946/Projects/canvas_grab')
 from canvasapi import Canvas
 from canvasapi.exceptions import ResourceDoesNotExist
 
+from canvas_pages import (
+    SyncManifest,
+    attach_rate_limiter,
+    fetch_concurrently,
+    get_course_page_index,
+    is_rate_limit_error,
+    use_pooled_session,
+)
+import http_client
+from incremental_write import CREATED, UNCHANGED, UPDATED, WriteStats, write_if_changed
+
 # Configuration
 CANVAS_ENDPOINT = "https://usucourses.instructure.com"
 COURSE_ID = 2879
 BASE_DIR = Path(__file__).parent
+SYNC_MANIFEST_FILE = BASE_DIR / "canvas-sync-manifest.json"
+IMAGE_INDEX_CACHE_FILE = BASE_DIR / ".image-index-cache.json"
+
+# Above this many redirect files, list every page (with bodies) once instead
+# of calling get_page() per file
+BULK_FETCH_MIN_PAGES = 10
 
 def get_canvas_token():
     """Get Canvas token from environment."""
@@ -95,33 +114,20 @@ def get_page_title_from_redirect(html_content):
     return None
 
 def find_page_by_title(course, title):
-    """Find a Canvas page by matching its title."""
-    try:
-        pages = list(course.get_pages())
-        # Normalize title for comparison (remove extra spaces, handle entities)
-        normalized_title = ' '.join(title.split())
-
-        # Try exact match first
-        for page in pages:
-            if page.title == title or page.title == normalized_title:
-                return page
-        # Try case-insensitive match
-        for page in pages:
-            if page.title.lower() == title.lower() or page.title.lower() == normalized_title.lower():
-                return page
-        # Try partial match (in case of extra characters)
-        for page in pages:
-            page_title_lower = page.title.lower()
-            title_lower = normalized_title.lower()
-            if title_lower in page_title_lower or page_title_lower in title_lower:
-                # Check if it's a reasonable match (at least 50% of words match)
-                title_words = set(title_lower.split())
-                page_words = set(page_title_lower.split())
-                if len(title_words) > 0 and len(title_words & page_words) / len(title_words) >= 0.5:
-                    return page
-    except Exception as e:
-        print(f"  Error searching pages: {e}")
-    return None
+    """Find a Canvas page by matching its title.
+
+    Uses the course's PageIndex, so the page listing is fetched once per run
+    no matter how many titles are looked up. The listing includes page
+    bodies, so a page found here needs no further request. Errors from the
+    listing are raised for the caller to report.
+    """
+    page_index = get_course_page_index(course, include_body=True)
+    # Exact, case-insensitive and same-words matches first
+    page = page_index.find(title)
+    if page:
+        return page
+    # Try partial match (in case of extra characters)
+    return page_index.find_partial(title, min_coverage=0.5)
 
 def create_full_html_page(title, body_content, original_url, base_dir):
     """Create a complete HTML page with Canvas styling matching the live site.
@@ -171,18 +177,131 @@ def create_full_html_page(title, body_content, original_url, base_dir):
 </html>'''
 
 def download_page_content(canvas, course, page):
-    """Download the actual content of a Canvas page."""
+    """Download the actual content of a Canvas page.
+
+    Pages from course.get_page() or a listing with include[]=body already
+    carry their body, so this only makes a request for pages that do not.
+    Returns None if the page has no body or no longer exists; other errors
+    are raised for the caller to report.
+    """
+    if hasattr(page, 'body'):
+        return page.body or None
     try:
         # Fetch the full page to get body content
         full_page = course.get_page(page.url)
         return full_page.body if hasattr(full_page, 'body') and full_page.body else None
     except ResourceDoesNotExist:
         return None
-    except Exception as e:
-        print(f"  Error fetching page {page.url}: {e}")
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.svg']
+
+class LocalImageIndex:
+    """Index of every file under base_dir by basename and by stem.
+
+    Built with a single directory walk so image lookups do not rglob the
+    whole tree for every <img>. Hidden files and directories (.git, caches,
+    .tmp- files etc.) are skipped. The index can be saved to a JSON cache
+    that stays valid until a file is added, removed or renamed somewhere in
+    the tree: subdirectories are checked by modification time, base_dir
+    itself by its listing. (Caches and manifests are rewritten in base_dir
+    with tempfile + os.replace, which moves its mtime without changing
+    what the index holds.)
+    """
+
+    # 2: base_dir is checked by its listing, hidden files are not indexed
+    CACHE_VERSION = 2
+
+    def __init__(self, base_dir, files=(), dir_mtimes=None, root_entries=None):
+        self.base_dir = base_dir
+        self.dir_mtimes = dir_mtimes or {}
+        self.root_entries = root_entries or []
+        self.by_name = {}
+        self.by_stem = {}
+        for rel_path in sorted(files):
+            path = Path(rel_path)
+            self.by_name.setdefault(path.name, []).append(path)
+            self.by_stem.setdefault(os.path.splitext(path.name)[0], []).append(path)
+
+    @staticmethod
+    def _root_entries(base_dir):
+        return sorted(name for name in os.listdir(base_dir) if not name.startswith('.') and name != '__pycache__')
+
+    @classmethod
+    def build(cls, base_dir):
+        """Walk base_dir once and index every file."""
+        files = []
+        dir_mtimes = {}
+        for dirpath, dirnames, filenames in os.walk(base_dir):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != '__pycache__']
+            rel_dir = os.path.relpath(dirpath, base_dir)
+            if rel_dir != '.':
+                dir_mtimes[rel_dir] = os.stat(dirpath).st_mtime_ns
+            for filename in filenames:
+                if not filename.startswith('.'):
+                    files.append(os.path.normpath(os.path.join(rel_dir, filename)))
+        return cls(base_dir, files, dir_mtimes, cls._root_entries(base_dir))
+
+    @classmethod
+    def load_or_build(cls, base_dir, cache_file):
+        """Load the index from cache_file if still valid, otherwise rebuild and save it."""
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if (cached.get('version') == cls.CACHE_VERSION
+                    and cached['root_entries'] == cls._root_entries(base_dir)
+                    and cls._dirs_unchanged(base_dir, cached['dir_mtimes'])):
+                return cls(base_dir, cached['files'], cached['dir_mtimes'], cached['root_entries'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.build(base_dir)
+        try:
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': cls.CACHE_VERSION,
+                    'root_entries': index.root_entries,
+                    'dir_mtimes': index.dir_mtimes,
+                    'files': [str(p) for paths in index.by_name.values() for p in paths],
+                }, f)
+        except OSError as e:
+            print(f"  ⚠️  Could not write image index cache: {e}")
+        return index
+
+    @staticmethod
+    def _dirs_unchanged(base_dir, dir_mtimes):
+        for rel_dir, mtime in dir_mtimes.items():
+            try:
+                if os.stat(base_dir / rel_dir).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def find(self, filename):
+        """Return the relative path of a file named filename, or of a file
+        with the same stem and a common image extension; None if neither exists."""
+        if filename in self.by_name:
+            return self.by_name[filename][0]
+        base_name = os.path.splitext(filename)[0]
+        candidates = self.by_stem.get(base_name, [])
+        for ext in IMAGE_EXTENSIONS:
+            for path in candidates:
+                if path.name == base_name + ext:
+                    return path
         return None
 
-def find_local_image(image_url, base_dir):
+_image_indexes = {}
+
+def get_image_index(base_dir, cache_file=None):
+    """Return the LocalImageIndex for base_dir, building it once per run."""
+    if base_dir not in _image_indexes:
+        if cache_file:
+            _image_indexes[base_dir] = LocalImageIndex.load_or_build(base_dir, cache_file)
+        else:
+            _image_indexes[base_dir] = LocalImageIndex.build(base_dir)
+    return _image_indexes[base_dir]
+
+def find_local_image(image_url, base_dir, image_index=None):
     """Find a local image file that matches the Canvas image URL.
 
     Returns the relative path to the local file if found, None otherwise.
@@ -198,86 +317,99 @@ def find_local_image(image_url, base_dir):
     if '?' in filename:
         filename = filename.split('?')[0]
 
-    # Search for the file in the directory structure
-    for img_file in base_dir.rglob(filename):
-        if img_file.is_file():
-            # Return relative path from base_dir
-            return img_file.relative_to(base_dir)
-
-    # Also try without query parameters or with different extensions
-    base_name = os.path.splitext(filename)[0]
-    for ext in ['.png', '.jpg', '.jpeg', '.gif', '.svg']:
-        for img_file in base_dir.rglob(base_name + ext):
-            if img_file.is_file():
-                return img_file.relative_to(base_dir)
+    if not filename:
+        return None
 
+    # Look the file up by name, then by stem with common image extensions.
     # If not found, return None (image will remain as Canvas URL)
-    return None
-
-def replace_image_urls(html_content, html_file_path, base_dir):
-    """Replace Canvas image URLs with local file paths."""
-    import re
-    import urllib.parse
-
-    def replace_url(match):
-        full_match = match.group(0)
-        url = match.group(1) or match.group(2)
+    if image_index is None:
+        image_index = get_image_index(base_dir)
+    return image_index.find(filename)
+
+# Everything write_page rewrites in a page body, combined into one pattern so
+# the body is scanned once: user_content wrappers (removed) and Canvas image
+# URLs in <img src>, background-image: url(...) and <link href> (mapped to
+# local files). A match with no URL group is a wrapper.
+BODY_REWRITE_PATTERN = re.compile(
+    r'<div\s+class=["\']user_content["\']>\s*'
+    r'|</div>\s*<!--\s*end\s+user_content\s*-->'
+    r'|<img[^>]+src=["\'](?P<img_url>[^"\']+)["\'][^>]*>'
+    r'|background-image:\s*url\(["\']?(?P<bg_url>[^"\'()]+)["\']?\)'
+    r'|<link[^>]+href=["\'](?P<link_url>[^"\']+\.(?:png|jpg|jpeg|gif|svg))["\']',
+    re.IGNORECASE
+)
+BACKGROUND_IMAGE_PATTERN = re.compile(r'background-image:\s*url\(["\']?([^"\'()]+)["\']?\)', re.IGNORECASE)
+
+def rewrite_page_body(body_content, html_file_path, base_dir, image_index=None, strip_wrappers=True):
+    """Strip user_content wrappers and map Canvas image URLs in a single pass.
+
+    Does the work of removing the wrappers and then running separate
+    substitutions for <img src>, background-image and <link href>. Canvas
+    image URLs that name a file in the course tree are replaced by its
+    path relative to html_file_path (the multi-pass code never did: it
+    looked up the text before each URL instead of the URL).
+    Pass a LocalImageIndex to share one index across all pages; by default
+    the per-run index for base_dir is used.
+    """
+    if image_index is None:
+        image_index = get_image_index(base_dir)
+    html_dir = html_file_path.parent
+    local_urls = {}
 
+    def local_url(url):
+        """Return the relative path to use for url, or None to leave it alone."""
         # Skip data URLs and local paths
         if url.startswith('data:') or url.startswith('#') or not url.startswith('http'):
-            return full_match
-
+            return None
         # Only process Canvas image URLs
         if 'instructure.com' not in url and 'canvas' not in url.lower():
-            return full_match
-
-        # Find local image
-        local_path = find_local_image(url, base_dir)
-        if local_path:
-            # Calculate relative path from HTML file to image
-            html_dir = html_file_path.parent
-            try:
-                rel_path = os.path.relpath(base_dir / local_path, html_dir)
-                # Normalize path separators for web
-                rel_path = rel_path.replace('\\', '/')
-                return full_match.replace(url, rel_path)
-            except ValueError:
-                # Paths on different drives (Windows) - use absolute-ish path
-                return full_match
-
-        return full_match
-
-    # Replace img src attributes
-    html_content = re.sub(
-        r'(<img[^>]+src=["\'])([^"\']+)(["\'][^>]*>)',
-        replace_url,
-        html_content,
-        flags=re.IGNORECASE
-    )
-
-    # Replace background-image URLs in style attributes
-    html_content = re.sub(
-        r'(background-image:\s*url\(["\']?)([^"\'()]+)(["\']?\))',
-        replace_url,
-        html_content,
-        flags=re.IGNORECASE
-    )
-
-    # Replace CSS link hrefs that point to images
-    html_content = re.sub(
-        r'(<link[^>]+href=["\'])([^"\']+\.(png|jpg|jpeg|gif|svg))(["\'])',
-        replace_url,
-        html_content,
-        flags=re.IGNORECASE
-    )
-
-    return html_content
+            return None
+        if url not in local_urls:
+            local_urls[url] = None
+            # Find local image
+            local_path = find_local_image(url, base_dir, image_index)
+            if local_path:
+                try:
+                    # Calculate relative path from HTML file to image, with web separators
+                    local_urls[url] = os.path.relpath(base_dir / local_path, html_dir).replace('\\', '/')
+                except ValueError:
+                    # Paths on different drives (Windows) - keep the Canvas URL
+                    pass
+        return local_urls[url]
+
+    def replace_url(text, url):
+        rel_path = local_url(url)
+        return text.replace(url, rel_path) if rel_path else text
+
+    def replace_background(match):
+        return replace_url(match.group(0), match.group(1))
+
+    def rewrite(match):
+        text = match.group(0)
+        url_group = match.lastgroup
+        if url_group is None:
+            return '' if strip_wrappers else text
+        text = replace_url(text, match.group(url_group))
+        if url_group == 'bg_url':
+            return text
+        # A tag's style attribute can also hold a background-image URL
+        if 'url(' in text:
+            text = BACKGROUND_IMAGE_PATTERN.sub(replace_background, text)
+        return text
+
+    body_content = BODY_REWRITE_PATTERN.sub(rewrite, body_content)
+    return body_content.strip() if strip_wrappers else body_content
+
+def replace_image_urls(html_content, html_file_path, base_dir, image_index=None):
+    """Replace Canvas image URLs with local file paths.
+
+    Pass a LocalImageIndex to share one index across all pages; by default
+    the per-run index for base_dir is used.
+    """
+    return rewrite_page_body(html_content, html_file_path, base_dir, image_index, strip_wrappers=False)
 
 def download_canvas_css(canvas_url, base_dir):
     """Download Canvas CSS file if referenced in page content."""
-    import requests
-    import re
-
     # Extract CSS URL from Canvas page
     css_url = "https://instructure-uploads.s3.amazonaws.com/account_43980000000000001/attachments/1016014/canvas_global_app.css"
     css_filename = "canvas_global_app.css"
@@ -288,7 +420,7 @@ def download_canvas_css(canvas_url, base_dir):
 
     try:
         print(f"  📥 Downloading Canvas CSS...")
-        response = requests.get(css_url, timeout=10)
+        response = http_client.get(css_url, timeout=10)
         response.raise_for_status()
         css_path.write_text(response.text, encoding='utf-8')
         print(f"  ✅ Downloaded {css_filename}")
@@ -297,6 +429,180 @@ def download_canvas_css(canvas_url, base_dir):
         print(f"  ⚠️  Could not download Canvas CSS: {e}")
         return None
 
+def prepare_page_job(html_file):
+    """Read an HTML file and describe the work needed to regenerate it.
+
+    Returns a dict for the fetch and write stages, or None (after printing a
+    warning) if the file cannot be processed.
+    """
+    content = html_file.read_text(encoding='utf-8')
+
+    # Check if it's a redirect file or already processed
+    is_redirect = 'meta http-equiv="refresh"' in content or 'meta http-equiv=\'refresh\'' in content
+
+    if is_redirect:
+        # Extract Canvas URL
+        canvas_url = extract_canvas_url_from_redirect(content)
+        if not canvas_url:
+            print(f"  ⚠️  Could not extract URL from {html_file.name}")
+            return None
+
+        # Extract page title from redirect file
+        page_title = get_page_title_from_redirect(content)
+        if not page_title:
+            print(f"  ⚠️  Could not extract page title from {html_file.name}")
+            return None
+
+        return {
+            'html_file': html_file,
+            'is_redirect': True,
+            'needs_fetch': True,
+            'canvas_url': canvas_url,
+            'page_title': page_title,
+        }
+
+    # Already processed file - extract content from user_content div if present
+    user_content_match = re.search(r'<div class="user_content">(.*?)</div>\s*<!-- end user_content -->', content, re.DOTALL)
+    if user_content_match:
+        body_content = user_content_match.group(1)
+    else:
+        # Fallback: extract from content div
+        body_match = re.search(r'<div class="content">(.*?)<div class="original-link">', content, re.DOTALL)
+        if body_match:
+            body_content = body_match.group(1)
+            # Remove any existing user_content wrapper
+            body_content = re.sub(r'<div class="user_content">(.*?)</div>', r'\1', body_content, flags=re.DOTALL)
+        else:
+            # Fallback: extract everything between body tags
+            body_match = re.search(r'<body[^>]*>(.*?)</body>', content, re.DOTALL | re.IGNORECASE)
+            if body_match:
+                body_content = body_match.group(1)
+                # Remove any existing user_content wrapper
+                body_content = re.sub(r'<div class="user_content">(.*?)</div>', r'\1', body_content, flags=re.DOTALL)
+            else:
+                print(f"  ⚠️  Could not extract body content from {html_file.name}")
+                return None
+
+    # Extract title
+    title_match = re.search(r'<title>([^<]+)</title>', content)
+    if title_match:
+        title = title_match.group(1)
+        # Clean up title (remove ": WINTER 25-26 COURSE UPDATES" if present)
+        title = re.sub(r':\s*WINTER 25-26 COURSE UPDATES.*$', '', title)
+    else:
+        title = html_file.stem
+
+    # Extract original URL if present
+    url_match = re.search(r'<a href="([^"]+)"[^>]*target="_blank"[^>]*>View original', content)
+    canvas_url = url_match.group(1) if url_match else "#"
+
+    return {
+        'html_file': html_file,
+        'is_redirect': False,
+        'needs_fetch': False,
+        'canvas_url': canvas_url,
+        'title': title,
+        'body_content': body_content,
+    }
+
+def fetch_page_content(canvas, course, job, page_index=None):
+    """Resolve a redirect job to its Canvas page and its body.
+
+    The returned page already carries body and updated_at, so each page costs
+    at most one request (none if page_index was listed with bodies).
+    Runs on a worker thread, so it does not print: returns (page, body,
+    errors), where errors lists messages for the main thread to report.
+    """
+    errors = []
+    # Try to find page by URL first
+    page_url = get_page_url_from_canvas_url(job['canvas_url'])
+    page = None
+    if page_url and page_index is not None:
+        page = page_index.get(page_url)
+    if page_url and not page:
+        try:
+            page = course.get_page(page_url)
+        except Exception as e:
+            # Let rate-limited requests be retried by the fetch pool
+            if is_rate_limit_error(e):
+                raise
+
+    # If not found by URL, try to find by title
+    if not page:
+        try:
+            page = find_page_by_title(course, job['page_title'])
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise
+            errors.append(f"Error searching pages: {e}")
+
+    if not page:
+        return None, None, errors
+
+    # Body comes with the page; only fetched again if it is missing
+    try:
+        body_content = download_page_content(canvas, course, page)
+    except Exception as e:
+        if is_rate_limit_error(e):
+            raise
+        errors.append(f"Error fetching page {page.url}: {e}")
+        body_content = None
+    return page, body_content, errors
+
+def select_changed_jobs(jobs, page_index, manifest):
+    """Keep only the jobs whose Canvas page changed since the last sync.
+
+    page_index is the course's page listing. Jobs for pages whose updated_at
+    no longer matches the manifest are switched to re-fetch from Canvas;
+    redirect files are always fetched. Jobs whose page is not in the listing
+    (renamed or deleted on Canvas) are left out and returned separately.
+    Returns (jobs, unchanged_count, missing_jobs).
+    """
+    changed = []
+    missing = []
+    unchanged_count = 0
+    for job in jobs:
+        if job['is_redirect']:
+            changed.append(job)
+            continue
+        slug = get_page_url_from_canvas_url(job['canvas_url'])
+        page = page_index.get(slug) if slug else None
+        if page is None:
+            missing.append(job)
+            continue
+        local_path = job['html_file'].relative_to(BASE_DIR)
+        if manifest.is_current(slug, page.updated_at, local_path):
+            unchanged_count += 1
+            continue
+        job['needs_fetch'] = True
+        job['page_title'] = page.title
+        changed.append(job)
+    return changed, unchanged_count, missing
+
+def write_page(html_file, title, body_content, canvas_url, image_index=None, write_stats=None):
+    """Rewrite body content for local viewing and write the full HTML page.
+
+    The file is only written if the rendered page differs from what is on
+    disk. Returns 'created', 'updated' or 'unchanged'.
+    """
+    # Remove any existing user_content wrapper (we'll add our own) and
+    # replace image URLs with local paths
+    print(f"    🔍 Mapping images to local files...")
+    body_content = rewrite_page_body(body_content, html_file, BASE_DIR, image_index)
+
+    # Create full HTML page with Canvas styling
+    full_html = create_full_html_page(
+        title,
+        body_content,
+        canvas_url,
+        BASE_DIR
+    )
+
+    # Write the new content (skipped if identical, so mtimes only move on real changes)
+    if write_stats is not None:
+        return write_stats.write(html_file, full_html)
+    return write_if_changed(html_file, full_html)
+
 def main():
     """Main function to download page content."""
     import argparse
@@ -307,7 +613,12 @@ def main():
     parser.add_argument('--download-canvas-css', action='store_true', help='Download Canvas CSS file automatically')
     parser.add_argument('--apply-to-all', action='store_true', help='Apply CSS to all HTML files, not just redirects')
     parser.add_argument('--use-canvas-css', action='store_true', help='Use Canvas CSS (loads canvas_global_app.css if it exists)')
+    parser.add_argument('--workers', type=int, default=4, help='Number of concurrent Canvas page fetches (default: 4)')
+    parser.add_argument('--sync', action='store_true', help='Only re-download pages changed on Canvas since the last run (implies --apply-to-all)')
+    parser.add_argument('--image-cache', action='store_true', help=f'Reuse the local image index saved in {IMAGE_INDEX_CACHE_FILE.name} while the tree is unchanged')
     args = parser.parse_args()
+    if args.sync:
+        args.apply_to_all = True
 
     if args.apply_to_all:
         print("🔍 Finding all HTML files...")
@@ -352,143 +663,121 @@ def main():
     print("\n🔗 Connecting to Canvas...")
     try:
         token = get_canvas_token()
-        canvas = Canvas(CANVAS_ENDPOINT, token)
+        canvas = use_pooled_session(Canvas(CANVAS_ENDPOINT, token))
         course = canvas.get_course(COURSE_ID)
         print(f"✅ Connected to course: {course.name}")
     except Exception as e:
         print(f"❌ Error connecting to Canvas: {e}")
         return
 
-    # Process each HTML file
+    # Stage 1: read every file and work out what it needs from Canvas
     print(f"\n📥 Downloading page content...")
-    success_count = 0
+    write_stats = WriteStats()
     failed_count = 0
+    unchanged_count = 0
+    missing_count = 0
+    manifest = SyncManifest(SYNC_MANIFEST_FILE)
 
-    # No need to store CSS settings - using fixed Canvas structure
-
+    jobs = []
     for html_file in html_files:
         try:
-            # Read the HTML file
-            content = html_file.read_text(encoding='utf-8')
-
-            # Check if it's a redirect file or already processed
-            is_redirect = 'meta http-equiv="refresh"' in content or 'meta http-equiv=\'refresh\'' in content
-
-            if is_redirect:
-                # Extract Canvas URL
-                canvas_url = extract_canvas_url_from_redirect(content)
-                if not canvas_url:
-                    print(f"  ⚠️  Could not extract URL from {html_file.name}")
-                    failed_count += 1
-                    continue
-
-                # Extract page title from redirect file
-                page_title = get_page_title_from_redirect(content)
-                if not page_title:
-                    print(f"  ⚠️  Could not extract page title from {html_file.name}")
-                    failed_count += 1
-                    continue
-
-                print(f"  📄 Processing: {html_file.name} (title: {page_title})")
-
-                # Try to find page by URL first
-                page_url = get_page_url_from_canvas_url(canvas_url)
-                page = None
-                if page_url:
-                    try:
-                        page = course.get_page(page_url)
-                    except:
-                        pass
-
-                # If not found by URL, try to find by title
-                if not page:
-                    page = find_page_by_title(course, page_title)
+            job = prepare_page_job(html_file)
+        except Exception as e:
+            print(f"  ❌ Error processing {html_file.name}: {e}")
+            failed_count += 1
+            continue
+        if job is None:
+            failed_count += 1
+            continue
+        jobs.append(job)
+
+    page_index = None
+    if args.sync:
+        # One listing with bodies serves both the comparison and the pages
+        # that changed, which need no further request
+        print(f"  🔄 Comparing Canvas pages against {SYNC_MANIFEST_FILE.name}...")
+        page_index = get_course_page_index(course, include_body=True)
+        jobs, unchanged_count, missing_jobs = select_changed_jobs(jobs, page_index, manifest)
+        for job in missing_jobs:
+            print(f"  ⚠️  {job['html_file'].name}: page not found on Canvas ({job['canvas_url']})")
+        missing_count = len(missing_jobs)
+        print(f"  {len(jobs)} pages to refresh, {unchanged_count} unchanged, {missing_count} missing")
+
+    # Index local images once for every page written below
+    image_index = get_image_index(BASE_DIR, IMAGE_INDEX_CACHE_FILE if args.image_cache else None)
+
+    # Stage 2: fetch redirect pages from Canvas concurrently. Results come
+    # back in job order, so stage 3 can write each file as soon as its
+    # fetch (and every fetch before it) has finished.
+    limiter = attach_rate_limiter(canvas)
+    fetch_jobs = [job for job in jobs if job['needs_fetch']]
+    fetch_results = iter(())
+    if page_index is None and len(fetch_jobs) >= BULK_FETCH_MIN_PAGES:
+        # One paginated listing with bodies is far fewer requests than one
+        # get_page() per file
+        print(f"  📚 Listing course pages with bodies...")
+        page_index = get_course_page_index(course, include_body=True)
+    if fetch_jobs:
+        print(f"  🌐 Fetching {len(fetch_jobs)} pages from Canvas ({args.workers} workers)...")
+        fetch_results = fetch_concurrently(
+            partial(fetch_page_content, canvas, course, page_index=page_index),
+            fetch_jobs,
+            max_workers=args.workers,
+            limiter=limiter
+        )
 
+    # Stage 3: rewrite and write each file in the original order
+    for job in jobs:
+        html_file = job['html_file']
+        try:
+            if job['needs_fetch']:
+                print(f"  📄 Processing: {html_file.name} (title: {job['page_title']})")
+                _, result, error = next(fetch_results)
+                if error:
+                    raise error
+                page, body_content, fetch_errors = result
+                for message in fetch_errors:
+                    print(f"  {message}")
                 if not page:
-                    print(f"  ❌ Could not find page '{page_title}' in Canvas")
+                    print(f"  ❌ Could not find page '{job['page_title']}' in Canvas")
                     failed_count += 1
                     continue
-
-                # Get page body content (need to fetch full page)
-                body_content = download_page_content(canvas, course, page)
                 if not body_content:
-                    print(f"  ❌ Page '{page_title}' has no body content")
+                    print(f"  ❌ Page '{job['page_title']}' has no body content")
                     failed_count += 1
                     continue
-
                 title = page.title
+                local_path = html_file.relative_to(BASE_DIR)
+                if not job['is_redirect'] and manifest.body_unchanged(page.url, body_content, local_path):
+                    # Page metadata changed on Canvas but the body did not
+                    manifest.record(page, body_content, local_path)
+                    print(f"  ⏭️  Unchanged {html_file.name}")
+                    unchanged_count += 1
+                    continue
+                status = write_page(html_file, title, body_content, job['canvas_url'], image_index, write_stats)
+                manifest.record(page, body_content, local_path)
             else:
-                # Already processed file - extract content from user_content div if present
                 print(f"  📄 Updating CSS in: {html_file.name}")
+                status = write_page(html_file, job['title'], job['body_content'], job['canvas_url'], image_index, write_stats)
 
-                # Try to extract content from user_content div first
-                user_content_match = re.search(r'<div class="user_content">(.*?)</div>\s*<!-- end user_content -->', content, re.DOTALL)
-                if user_content_match:
-                    body_content = user_content_match.group(1)
-                else:
-                    # Fallback: extract from content div
-                    body_match = re.search(r'<div class="content">(.*?)<div class="original-link">', content, re.DOTALL)
-                    if body_match:
-                        body_content = body_match.group(1)
-                        # Remove any existing user_content wrapper
-                        body_content = re.sub(r'<div class="user_content">(.*?)</div>', r'\1', body_content, flags=re.DOTALL)
-                    else:
-                        # Fallback: extract everything between body tags
-                        body_match = re.search(r'<body[^>]*>(.*?)</body>', content, re.DOTALL | re.IGNORECASE)
-                        if body_match:
-                            body_content = body_match.group(1)
-                            # Remove any existing user_content wrapper
-                            body_content = re.sub(r'<div class="user_content">(.*?)</div>', r'\1', body_content, flags=re.DOTALL)
-                        else:
-                            print(f"  ⚠️  Could not extract body content from {html_file.name}")
-                            failed_count += 1
-                            continue
-
-                # Extract title
-                title_match = re.search(r'<title>([^<]+)</title>', content)
-                if title_match:
-                    title = title_match.group(1)
-                    # Clean up title (remove ": WINTER 25-26 COURSE UPDATES" if present)
-                    title = re.sub(r':\s*WINTER 25-26 COURSE UPDATES.*$', '', title)
-                else:
-                    title = html_file.stem
-
-                # Extract original URL if present
-                url_match = re.search(r'<a href="([^"]+)"[^>]*target="_blank"[^>]*>View original', content)
-                canvas_url = url_match.group(1) if url_match else "#"
-
-            # Remove any existing user_content wrapper from body content (we'll add our own)
-            # Remove opening user_content divs
-            body_content = re.sub(r'<div\s+class=["\']user_content["\']>\s*', '', body_content, flags=re.IGNORECASE)
-            # Remove closing user_content divs and comments
-            body_content = re.sub(r'</div>\s*<!--\s*end\s+user_content\s*-->', '', body_content, flags=re.IGNORECASE)
-            body_content = re.sub(r'</div>\s*<!--\s*end user_content\s*-->', '', body_content, flags=re.IGNORECASE)
-            # Also remove any standalone closing divs that might be leftover
-            body_content = body_content.strip()
-
-            # Replace image URLs with local paths
-            print(f"    🔍 Mapping images to local files...")
-            body_content = replace_image_urls(body_content, html_file, BASE_DIR)
-
-            # Create full HTML page with Canvas styling
-            full_html = create_full_html_page(
-                title,
-                body_content,
-                canvas_url,
-                BASE_DIR
-            )
-
-            # Write the new content
-            html_file.write_text(full_html, encoding='utf-8')
-            print(f"  ✅ Updated {html_file.name}")
-            success_count += 1
+            if status == UNCHANGED:
+                print(f"  ⏭️  Unchanged {html_file.name}")
+            else:
+                print(f"  ✅ {status.capitalize()} {html_file.name}")
 
         except Exception as e:
             print(f"  ❌ Error processing {html_file.name}: {e}")
             failed_count += 1
 
+    if fetch_jobs:
+        manifest.save()
+
     print(f"\n✅ Complete!")
-    print(f"   Successfully updated: {success_count}")
+    print(f"   Created: {write_stats.counts[CREATED]}")
+    print(f"   Updated: {write_stats.counts[UPDATED]}")
+    print(f"   Unchanged: {write_stats.counts[UNCHANGED] + unchanged_count}")
+    if args.sync:
+        print(f"   Missing on Canvas: {missing_count}")
     print(f"   Failed: {failed_count}")
     print(f"   Total: {len(html_files)}")
 
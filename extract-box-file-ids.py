@@ -13,6 +13,8 @@ import sys
 import re
 from pathlib import Path
 
+from file_matching import FilenameIndex
+
 CANVAS_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 FILE_IDS_JSON = CANVAS_DIR / "box-file-ids.json"
 TEMPLATE_FILE_IDS = CANVAS_DIR / "box-file-ids-template.json"
@@ -45,13 +47,6 @@ def load_file_ids():
             return json.load(f)
     return {'files': []}
 
-def find_file_by_name(files, filename):
-    """Find file entry by filename."""
-    for f in files:
-        if filename.lower() in f['relative_path'].lower():
-            return f
-    return None
-
 def main():
     print("📋 Box File ID Extractor")
     print("=" * 50)
@@ -84,11 +79,8 @@ def main():
     file_ids_data = load_file_ids()
     files = file_ids_data.get('files', [])
 
-    # Create lookup by filename
-    file_lookup = {}
-    for f in files:
-        filename = Path(f['relative_path']).name.lower()
-        file_lookup[filename] = f
+    # Index entries by filename
+    file_index = FilenameIndex(files)
 
     # Process URLs
     updated_count = 0
@@ -102,9 +94,9 @@ def main():
 
         filename = extract_file_name_from_url(url)
         if filename:
-            filename = filename.lower()
-            if filename in file_lookup:
-                file_entry = file_lookup[filename]
+            exact = file_index.exact(filename)
+            if exact:
+                file_entry = exact[0]
                 if not file_entry.get('file_id'):
                     file_entry['file_id'] = file_id
                     file_entry['box_url'] = url
@@ -113,17 +105,16 @@ def main():
             else:
                 # Try to find by partial match
                 found = False
-                for f in files:
-                    if filename.replace('.docx', '') in f['relative_path'].lower():
-                        if not f.get('file_id'):
-                            f['file_id'] = file_id
-                            f['box_url'] = url
-                            updated_count += 1
-                            print(f"✅ Updated (partial match): {f['relative_path']} -> {file_id}")
-                            found = True
-                            break
+                for f in file_index.containing(filename):
+                    if not f.get('file_id'):
+                        f['file_id'] = file_id
+                        f['box_url'] = url
+                        updated_count += 1
+                        print(f"✅ Updated (partial match): {f['relative_path']} -> {file_id}")
+                        found = True
+                        break
                 if not found:
-                    print(f"⚠️  Could not find file entry for: {filename}")
+                    print(f"⚠️  Could not find file entry for: {filename.lower()}")
         else:
             # No filename in URL, just add as note
             print(f"ℹ️  Extracted ID {file_id} but couldn't match to file (URL: {url})")
@@ -5,26 +5,25 @@ Extract all Canvas page links from HTML files in the project.
 
 import re
 from pathlib import Path
-from bs4 import BeautifulSoup
 import json
 
+from course_pages import CoursePageCache
+from incremental_write import write_if_changed
+
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 HTML_DIR = COURSE_DIR / "WINTER 25-26 COURSE UPDATES"
 OUTPUT_FILE = COURSE_DIR / "canvas-page-links.json"
+PAGE_CACHE_FILE = COURSE_DIR / ".course-page-cache.json"
+
+# One parse per changed page, shared by every extract_* call
+_page_cache = CoursePageCache(PAGE_CACHE_FILE)
 
 def extract_canvas_url_from_html(html_file_path):
     """Extract Canvas URL from HTML file."""
     if not html_file_path.exists():
         return None
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        soup = BeautifulSoup(content, 'html.parser')
-        original_link = soup.find('div', class_='original-link')
-        if original_link:
-            a_tag = original_link.find('a')
-            if a_tag and 'href' in a_tag.attrs:
-                return a_tag['href']
+        return _page_cache.get(html_file_path).canvas_url
     except Exception as e:
         print(f"  ⚠️  Error reading {html_file_path}: {e}")
     return None
@@ -34,12 +33,8 @@ def extract_page_title_from_html(html_file_path):
     if not html_file_path.exists():
         return None
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        soup = BeautifulSoup(content, 'html.parser')
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text().strip()
+        title = _page_cache.get(html_file_path).title
+        if title is not None:
             # Remove ": WINTER 25-26 COURSE UPDATES" suffix if present
             title = re.sub(r':\s*WINTER 25-26 COURSE UPDATES', '', title)
             return title
@@ -67,25 +62,24 @@ def main():
                 print(f"  ✅ {relative_path}: {canvas_url}")
             else:
                 print(f"  ⚠️  {relative_path}: No Canvas URL found")
+    _page_cache.save()
 
-    # Write to JSON file
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(canvas_links, f, indent=2, ensure_ascii=False)
+    # Write to JSON file (left untouched if nothing changed)
+    status = write_if_changed(OUTPUT_FILE, json.dumps(canvas_links, indent=2, ensure_ascii=False))
 
     print(f"\n✅ Extracted {len(canvas_links)} Canvas page links")
-    print(f"💾 Saved to {OUTPUT_FILE}")
+    print(f"💾 Saved to {OUTPUT_FILE} ({status})")
 
     # Also create a simple text list
     text_output = COURSE_DIR / "canvas-page-links.txt"
-    with open(text_output, 'w', encoding='utf-8') as f:
-        f.write("Canvas Page Links\n")
-        f.write("=" * 80 + "\n\n")
-        for file_path, info in sorted(canvas_links.items()):
-            f.write(f"{info['title']}\n")
-            f.write(f"  File: {file_path}\n")
-            f.write(f"  URL: {info['canvas_url']}\n\n")
-
-    print(f"💾 Also saved text version to {text_output}")
+    lines = ["Canvas Page Links\n", "=" * 80 + "\n\n"]
+    for file_path, info in sorted(canvas_links.items()):
+        lines.append(f"{info['title']}\n")
+        lines.append(f"  File: {file_path}\n")
+        lines.append(f"  URL: {info['canvas_url']}\n\n")
+    status = write_if_changed(text_output, ''.join(lines))
+
+    print(f"💾 Also saved text version to {text_output} ({status})")
 
 if __name__ == "__main__":
     main()
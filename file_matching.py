@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Filename matching between Box files and box-file-ids template entries.
+
+get-box-file-ids-rest.py, get-box-file-ids-api.py and extract-box-file-ids.py
+all resolve a .docx filename to an entry: an exact (case-insensitive) name
+match first, then a partial match where one name contains the other. The
+partial match used to scan every candidate for every unmatched name.
+FilenameIndex normalizes each name once and keeps an exact-name table and
+a trigram index, so a containment lookup only checks the names sharing all
+of the query's trigrams.
+
+When several names match, the shortest one wins (the closest to the query),
+then the lowest relative path, so the result does not depend on the order
+Box listed the files in.
+"""
+
+from collections import defaultdict
+from pathlib import Path
+
+DOCX_SUFFIX = '.docx'
+NGRAM = 3
+
+def normalize_filename(name):
+    """Case-folded filename with runs of whitespace collapsed."""
+    return ' '.join(name.casefold().split())
+
+def filename_stem(name):
+    """Normalized filename without its .docx extension."""
+    name = normalize_filename(name)
+    return name[:-len(DOCX_SUFFIX)] if name.endswith(DOCX_SUFFIX) else name
+
+def ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+class FilenameIndex:
+    """Entries (dicts with a 'relative_path') indexed by their filename.
+
+    Entries can be added one at a time, e.g. as a Box folder scan yields
+    them. Lookups return matching entries best first: shortest filename,
+    then lowest relative path, then the order they were added.
+    """
+
+    def __init__(self, entries=()):
+        self._entries = []
+        self._stems = []
+        self._by_name = defaultdict(list)
+        self._ngrams = defaultdict(set)
+        self._name_lengths = set()
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, entry):
+        position = len(self._entries)
+        path = entry['relative_path']
+        name = normalize_filename(Path(path).name)
+        stem = filename_stem(name)
+        self._entries.append((len(stem), normalize_filename(path), position, entry))
+        self._stems.append(stem)
+        self._by_name[name].append(position)
+        self._name_lengths.add(len(name))
+        for gram in ngrams(stem):
+            self._ngrams[gram].add(position)
+
+    def _ranked(self, positions):
+        return [self._entries[position][3] for position in sorted(positions, key=lambda p: self._entries[p][:3])]
+
+    def exact(self, filename):
+        """Entries whose filename equals filename (ignoring case and spacing)."""
+        return self._ranked(self._by_name.get(normalize_filename(filename), ()))
+
+    def containing(self, filename):
+        """Entries whose filename stem contains filename's stem."""
+        stem = filename_stem(filename)
+        grams = ngrams(stem)
+        if grams:
+            postings = sorted((self._ngrams.get(gram, set()) for gram in grams), key=len)
+            candidates = postings[0].intersection(*postings[1:])
+        else:
+            # Too short for a trigram; every stem may contain it
+            candidates = range(len(self._entries))
+        return self._ranked(position for position in candidates if stem in self._stems[position])
+
+    def contained_in(self, filename):
+        """Entries whose whole filename occurs inside filename's stem."""
+        stem = filename_stem(filename)
+        positions = set()
+        for length in self._name_lengths:
+            for start in range(len(stem) - length + 1):
+                positions.update(self._by_name.get(stem[start:start + length], ()))
+        return self._ranked(positions)
+
+    def best_match(self, filename):
+        """The best exact match, else the best partial match, else None."""
+        for lookup in (self.exact, self.containing, self.contained_in):
+            found = lookup(filename)
+            if found:
+                return found[0]
+        return None
+
+def match_files_to_template(box_files, template_files):
+    """Fill in template entries' file_id and box_url from matching Box files.
+
+    box_files may be a generator such as box_folders.scan_docx_files(); it
+    is indexed as it arrives. Each template entry takes its best match (see
+    FilenameIndex.best_match); entries without one are left as they are.
+
+    Returns (updated_count, list of the Box files seen).
+    """
+    index = FilenameIndex()
+    seen_files = []
+    for box_file in box_files:
+        seen_files.append(box_file)
+        index.add(box_file)
+
+    updated_count = 0
+    for template_entry in template_files:
+        box_file = index.best_match(Path(template_entry['relative_path']).name)
+        if box_file is not None:
+            template_entry['file_id'] = box_file['file_id']
+            template_entry['box_url'] = box_file['box_url']
+            updated_count += 1
+
+    return updated_count, seen_files
@@ -37,6 +37,9 @@ except ImportError:
         print(f"   ./run-box-api.sh")
         sys.exit(1)
 
+from box_folders import FOLDER_ITEM_FIELDS, PAGE_LIMIT, scan_docx_files
+from file_matching import match_files_to_template
+
 BOX_DIR = Path("/Users/a00288946/Library/CloudStorage/Box-Box/WebAIM Shared/5 Online Courses/Winter 25-25 Course Update")
 CANVAS_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 FILE_IDS_JSON = CANVAS_DIR / "box-file-ids.json"
@@ -104,76 +107,13 @@ def find_folder_by_path(client, folder_id, target_path_parts):
 
     return current_folder
 
-def scan_folder_for_docx(client, folder_id, base_path=""):
-    """Recursively scan Box folder for .docx files."""
-    files = []
-
-    try:
-        folder = client.folder(folder_id).get()
-
-        for item in folder.get_items():
-            if item.type == 'file' and item.name.endswith('.docx'):
-                # Skip files in Course Export
-                if 'Course Export' in base_path:
-                    continue
-                if '-test' in item.name.lower():
-                    continue
-
-                rel_path = f"{base_path}/{item.name}" if base_path else item.name
-
-                file_info = {
-                    'relative_path': rel_path,
-                    'file_id': str(item.id),
-                    'box_url': f"https://usu.app.box.com/file/{item.id}",
-                    'name': item.name,
-                    'notes': ''
-                }
-
-                files.append(file_info)
-                print(f"  ✅ Found: {rel_path} (ID: {item.id})")
-
-            elif item.type == 'folder':
-                new_path = f"{base_path}/{item.name}" if base_path else item.name
-                # Recursively scan subfolder
-                subfolder_files = scan_folder_for_docx(client, item.id, new_path)
-                files.extend(subfolder_files)
-
-    except Exception as e:
-        print(f"  ⚠️  Error scanning folder {folder_id}: {e}")
-
-    return files
-
-def match_files_to_template(box_files, template_files):
-    """Match Box API files to template entries."""
-    # Create lookup by filename
-    box_lookup = {}
-    for bf in box_files:
-        filename = Path(bf['relative_path']).name.lower()
-        box_lookup[filename] = bf
-
-    # Update template entries
-    updated_count = 0
-    for template_entry in template_files:
-        rel_path = template_entry['relative_path']
-        filename = Path(rel_path).name.lower()
-
-        # Try exact filename match
-        if filename in box_lookup:
-            box_file = box_lookup[filename]
-            template_entry['file_id'] = box_file['file_id']
-            template_entry['box_url'] = box_file['box_url']
-            updated_count += 1
-        else:
-            # Try partial match
-            for box_file in box_files:
-                if filename.replace('.docx', '') in box_file['name'].lower() or \
-                   box_file['name'].lower() in filename.replace('.docx', ''):
-                    template_entry['file_id'] = box_file['file_id']
-                    template_entry['box_url'] = box_file['box_url']
-                    updated_count += 1
-                    break
-
-    return updated_count
+def list_folder(client):
+    """Folder-listing function for box_folders.crawl()."""
+    def list_items(folder_id):
+        items = client.folder(folder_id).get_items(limit=PAGE_LIMIT, use_marker=True,
+                                                   fields=list(FOLDER_ITEM_FIELDS))
+        return ({field: getattr(item, field, None) for field in FOLDER_ITEM_FIELDS} for item in items)
+    return list_items
 
 def main():
     print("📦 Box API File ID Extractor")
@@ -240,16 +180,6 @@ def main():
         except:
             pass
 
-    # Scan for .docx files
-    print(f"\n📂 Scanning folder for .docx files...")
-    box_files = scan_folder_for_docx(client, folder_id)
-
-    if not box_files:
-        print("❌ No .docx files found in Box folder")
-        return
-
-    print(f"\n✅ Found {len(box_files)} .docx files in Box")
-
     # Load template
     if not TEMPLATE_FILE_IDS.exists():
         print("❌ Template file not found. Run add-box-office-links.py first.")
@@ -261,10 +191,16 @@ def main():
     template_files = template.get('files', [])
     print(f"📋 Template has {len(template_files)} files")
 
-    # Match files
-    print("\n🔗 Matching Box files to template...")
-    updated_count = match_files_to_template(box_files, template_files)
+    # Scan for .docx files, matching each to the template as it is found
+    print(f"\n📂 Scanning folder for .docx files...")
+    updated_count, box_files = match_files_to_template(
+        scan_docx_files(list_folder(client), folder_id), template_files)
+
+    if not box_files:
+        print("❌ No .docx files found in Box folder")
+        return
 
+    print(f"\n✅ Found {len(box_files)} .docx files in Box")
     print(f"✅ Matched {updated_count}/{len(template_files)} files")
 
     # Save updated file IDs
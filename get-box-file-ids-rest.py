@@ -3,6 +3,10 @@
 Get Box file IDs using Box REST API (no SDK required)
 
 This script uses Box REST API directly with requests library.
+
+Folder listings are cached in .box-folder-cache.json; a rerun lists only
+the folders whose etag, sequence_id or modified_at changed (--full lists
+every folder again).
 """
 
 import json
@@ -11,11 +15,16 @@ import sys
 import requests
 from pathlib import Path
 
+import http_client
+from box_folders import FolderListingCache, list_folder_items, print_folder_error, scan_docx_files
+from file_matching import match_files_to_template
+
 BOX_DIR = Path("/Users/a00288946/Library/CloudStorage/Box-Box/WebAIM Shared/5 Online Courses/Winter 25-25 Course Update")
 CANVAS_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 FILE_IDS_JSON = CANVAS_DIR / "box-file-ids.json"
 TEMPLATE_FILE_IDS = CANVAS_DIR / "box-file-ids-template.json"
 CONFIG_FILE = CANVAS_DIR / ".box-api-config.json"
+FOLDER_CACHE_FILE = CANVAS_DIR / ".box-folder-cache.json"
 
 BOX_API_BASE = "https://api.box.com/2.0"
 
@@ -44,105 +53,28 @@ def get_box_headers(config):
         'Content-Type': 'application/json'
     }
 
-def get_folder_items(headers, folder_id='0'):
-    """Get items in a Box folder."""
-    url = f"{BOX_API_BASE}/folders/{folder_id}/items"
-    params = {
-        'fields': 'id,name,type,path_collection',
-        'limit': 1000
-    }
-
-    try:
-        response = requests.get(url, headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"  ⚠️  Error accessing folder {folder_id}: {e}")
-        if hasattr(e.response, 'text'):
-            print(f"     Response: {e.response.text[:200]}")
-        return None
-
-def scan_folder_recursive(headers, folder_id, base_path="", all_files=None):
-    """Recursively scan Box folder for .docx files."""
-    if all_files is None:
-        all_files = []
-
-    data = get_folder_items(headers, folder_id)
-    if not data or 'entries' not in data:
-        return all_files
-
-    for item in data['entries']:
-        if item['type'] == 'file' and item['name'].endswith('.docx'):
-            # Skip files in Course Export
-            if 'Course Export' in base_path:
-                continue
-            if '-test' in item['name'].lower():
-                continue
-
-            rel_path = f"{base_path}/{item['name']}" if base_path else item['name']
-
-            file_info = {
-                'relative_path': rel_path,
-                'file_id': str(item['id']),
-                'box_url': f"https://usu.app.box.com/file/{item['id']}",
-                'name': item['name'],
-                'notes': ''
-            }
-
-            all_files.append(file_info)
-            print(f"  ✅ Found: {rel_path} (ID: {item['id']})")
-
-        elif item['type'] == 'folder':
-            new_path = f"{base_path}/{item['name']}" if base_path else item['name']
-            # Recursively scan subfolder
-            scan_folder_recursive(headers, item['id'], new_path, all_files)
-
-    return all_files
+def list_folder(headers):
+    """Folder-listing function for box_folders.crawl()."""
+    return lambda folder_id: list_folder_items(folder_id, headers)
 
 def find_folder_by_name(headers, folder_id, target_name):
     """Find a folder by name in current folder."""
-    data = get_folder_items(headers, folder_id)
-    if not data or 'entries' not in data:
-        return None
-
-    for item in data['entries']:
-        if item['type'] == 'folder' and item['name'] == target_name:
-            return item['id']
+    try:
+        for item in list_folder_items(folder_id, headers):
+            if item['type'] == 'folder' and item['name'] == target_name:
+                return item['id']
+    except requests.exceptions.RequestException as e:
+        print_folder_error(folder_id, '', e)
     return None
 
-def match_files_to_template(box_files, template_files):
-    """Match Box API files to template entries."""
-    # Create lookup by filename
-    box_lookup = {}
-    for bf in box_files:
-        filename = Path(bf['relative_path']).name.lower()
-        box_lookup[filename] = bf
-
-    # Update template entries
-    updated_count = 0
-    for template_entry in template_files:
-        rel_path = template_entry['relative_path']
-        filename = Path(rel_path).name.lower()
-
-        # Try exact filename match
-        if filename in box_lookup:
-            box_file = box_lookup[filename]
-            template_entry['file_id'] = box_file['file_id']
-            template_entry['box_url'] = box_file['box_url']
-            updated_count += 1
-        else:
-            # Try partial match
-            for box_file in box_files:
-                if filename.replace('.docx', '') in box_file['name'].lower() or \
-                   box_file['name'].lower() in filename.replace('.docx', ''):
-                    template_entry['file_id'] = box_file['file_id']
-                    template_entry['box_url'] = box_file['box_url']
-                    updated_count += 1
-                    break
+def main():
+    import argparse
 
-    return updated_count
+    parser = argparse.ArgumentParser(description='Get Box file IDs using the Box REST API')
+    parser.add_argument('--full', action='store_true',
+                        help='List every folder again instead of reusing unchanged cached listings')
+    args = parser.parse_args()
 
-def main():
     print("📦 Box REST API File ID Extractor")
     print("=" * 60)
 
@@ -173,7 +105,7 @@ def main():
     # Test connection
     print("\n🔗 Testing Box API connection...")
     try:
-        response = requests.get(f"{BOX_API_BASE}/users/me", headers=headers)
+        response = http_client.get(f"{BOX_API_BASE}/users/me", headers=headers)
         response.raise_for_status()
         user_info = response.json()
         print(f"✅ Connected as: {user_info.get('name', 'Unknown')}")
@@ -203,17 +135,6 @@ def main():
 
     folder_id = current_folder_id
 
-    # Scan for .docx files
-    print(f"\n📂 Scanning folder for .docx files...")
-    box_files = scan_folder_recursive(headers, folder_id)
-
-    if not box_files:
-        print("❌ No .docx files found in Box folder")
-        print("\n💡 Tip: Set BOX_FOLDER_ID to the specific course folder ID")
-        return
-
-    print(f"\n✅ Found {len(box_files)} .docx files in Box")
-
     # Load template
     if not TEMPLATE_FILE_IDS.exists():
         print("❌ Template file not found. Run add-box-office-links.py first.")
@@ -225,10 +146,20 @@ def main():
     template_files = template.get('files', [])
     print(f"📋 Template has {len(template_files)} files")
 
-    # Match files
-    print("\n🔗 Matching Box files to template...")
-    updated_count = match_files_to_template(box_files, template_files)
+    # Scan for .docx files, matching each to the template as it is found
+    print(f"\n📂 Scanning folder for .docx files...")
+    folder_cache = FolderListingCache(FOLDER_CACHE_FILE, refresh=args.full)
+    updated_count, box_files = match_files_to_template(
+        scan_docx_files(list_folder(headers), folder_id, cache=folder_cache), template_files)
+    print(f"  📁 Listed {folder_cache.listed} folders, reused {folder_cache.reused} unchanged")
+    folder_cache.save()
 
+    if not box_files:
+        print("❌ No .docx files found in Box folder")
+        print("\n💡 Tip: Set BOX_FOLDER_ID to the specific course folder ID")
+        return
+
+    print(f"\n✅ Found {len(box_files)} .docx files in Box")
     print(f"✅ Matched {updated_count}/{len(template_files)} files")
 
     # Save updated file IDs
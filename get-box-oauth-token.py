@@ -8,10 +8,11 @@ using the Authorization Code flow.
 
 import os
 import json
-import requests
 from pathlib import Path
 from urllib.parse import urlencode, parse_qs, urlparse
 
+import http_client
+
 BOX_AUTH_URL = "https://account.box.com/api/oauth2/authorize"
 BOX_TOKEN_URL = "https://api.box.com/oauth2/token"
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
@@ -55,7 +56,7 @@ def exchange_code_for_token(client_id, client_secret, authorization_code, redire
         'redirect_uri': redirect_uri
     }
 
-    response = requests.post(BOX_TOKEN_URL, data=data)
+    response = http_client.post(BOX_TOKEN_URL, data=data)
 
     # Check for errors and provide helpful messages
     if response.status_code != 200:
@@ -80,7 +81,7 @@ def refresh_access_token(client_id, client_secret, refresh_token):
         'client_secret': client_secret
     }
 
-    response = requests.post(BOX_TOKEN_URL, data=data)
+    response = http_client.post(BOX_TOKEN_URL, data=data)
     response.raise_for_status()
     return response.json()
 
@@ -10,17 +10,15 @@ import argparse
 import subprocess
 import sys
 from pathlib import Path
-from bs4 import BeautifulSoup
+from html_parsing import load_html, parse_html
 import re
-import requests
 import shutil
 
+import http_client
+
 def extract_user_content(html_file_path, output_dir=None):
     """Extract and clean the user_content div from HTML."""
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = load_html(html_file_path)
     user_content = soup.find('div', class_='user_content')
 
     if not user_content:
@@ -44,7 +42,7 @@ def download_image(img_url, output_dir):
         local_path = output_dir / filename
 
         # Download image
-        response = requests.get(img_url, stream=True, timeout=10)
+        response = http_client.get(img_url, stream=True, timeout=10)
         response.raise_for_status()
 
         with open(local_path, 'wb') as f:
@@ -57,8 +55,9 @@ def download_image(img_url, output_dir):
 
 def clean_html_content(element, output_dir=None):
     """Clean HTML content for DOCX conversion, preserving formatting and images."""
-    # Create a copy to avoid modifying the original
-    cleaned = BeautifulSoup(str(element), 'html.parser')
+    # Create a copy to avoid modifying the original (html.parser keeps it a
+    # bare fragment, which is what gets written out for Pandoc)
+    cleaned = parse_html(str(element), round_trip=True)
 
     # Replace iframes with placeholder text
     for iframe in cleaned.find_all('iframe'):
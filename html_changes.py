@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for applying DOCX tracked changes to course HTML.
+
+HtmlElementIndex reads the text of every block element under .user_content
+once and keeps an inverted word index over it, so finding the elements
+that contain a deleted passage or an insertion's context only touches
+elements sharing its words instead of calling get_text() on the whole page
+for every change. The index is kept current as changes edit the tree.
+
+update_html_using_mapping applies changes through a DOCX-HTML mapping
+(see create-docx-html-mapping.py); it is shared by update-canvas-from-docx.py
+and update-html-using-mapping.py.
+"""
+
+import re
+from collections import defaultdict
+
+from html_parsing import load_html
+
+# Elements whose text tracked changes are matched against
+TEXT_TAGS = ['p', 'li', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+# Elements an insertion can be placed next to
+BLOCK_TAGS = ['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def bounded_words(text):
+    """Words of text that are whole words wherever text occurs.
+
+    A word with a non-word character on both sides inside text is also a
+    whole word in any string containing text; the first and last words may
+    be fragments of longer words and are left out.
+    """
+    return {match.group() for match in WORD_PATTERN.finditer(text)
+            if match.start() > 0 and match.end() < len(text)}
+
+class HtmlElementIndex:
+    """Text of the TEXT_TAGS elements under a container, with a word index.
+
+    elements is in document order (the order of container.find_all(tags)).
+    For each element the index keeps get_text() and its stripped lower-case
+    form, plus word -> elements postings. Callers that edit the tree report
+    it with refresh(), insert_before() or append(); edited elements are
+    re-read lazily at the next lookup and from then on are always checked
+    directly rather than through the word postings, so an edit costs one
+    get_text() per affected element no matter how many text nodes changed.
+    """
+
+    def __init__(self, container, tags=TEXT_TAGS):
+        self.container = container
+        self.tags = tags
+        self.elements = list(container.find_all(tags))
+        self._entries = {}
+        self._postings = defaultdict(set)
+        self._unindexed = set()
+        self._stale = {}
+        self._positions = None
+        for element in self.elements:
+            text = element.get_text()
+            lower = text.strip().lower()
+            self._entries[id(element)] = (element, text, lower)
+            for word in set(WORD_PATTERN.findall(lower)):
+                self._postings[word].add(id(element))
+
+    def _reread(self):
+        """Re-read the text of elements edited since the last lookup."""
+        for key, element in self._stale.items():
+            text = element.get_text()
+            self._entries[key] = (element, text, text.strip().lower())
+            self._unindexed.add(key)
+        self._stale.clear()
+
+    def text(self, element):
+        """element.get_text(), current as of the last reported edit."""
+        self._reread()
+        return self._entries[id(element)][1]
+
+    def lower_text(self, element):
+        """element.get_text().strip().lower(), current as of the last reported edit."""
+        self._reread()
+        return self._entries[id(element)][2]
+
+    def _position(self, key):
+        if self._positions is None:
+            self._positions = {id(element): position for position, element in enumerate(self.elements)}
+        return self._positions[key]
+
+    def in_document_order(self, elements):
+        """Indexed elements sorted into document order, without duplicates."""
+        unique = {id(element): element for element in elements}
+        return [unique[key] for key in sorted(unique, key=self._position)]
+
+    def _attached(self, element):
+        return any(parent is self.container for parent in element.parents)
+
+    def containing(self, text, case_sensitive=False, tags=None):
+        """Elements whose text contains text, in document order.
+
+        With case_sensitive, text is matched against get_text(); otherwise
+        text.lower() is matched against the stripped lower-case text.
+        tags optionally narrows the result to some element names.
+        """
+        self._reread()
+        lower = text.lower()
+        words = bounded_words(lower)
+        if words:
+            postings = sorted((self._postings.get(word, set()) for word in words), key=len)
+            keys = postings[0].intersection(*postings[1:]) | self._unindexed
+        else:
+            keys = self._entries.keys()
+
+        found = []
+        for key in keys:
+            element, full_text, lower_text = self._entries[key]
+            if tags is not None and element.name not in tags:
+                continue
+            if (text in full_text) if case_sensitive else (lower in lower_text):
+                found.append(key)
+        found.sort(key=self._position)
+        return [element for element in (self._entries[key][0] for key in found) if self._attached(element)]
+
+    def refresh(self, *elements):
+        """Report edited elements; they and their ancestors are re-read.
+
+        Pass the element whose children changed (for a replaced text node,
+        its parent); elements detached by the edit are skipped by lookups.
+        """
+        for element in elements:
+            for related in [element, *element.parents]:
+                if id(related) in self._entries:
+                    self._stale[id(related)] = related
+
+    def insert_before(self, element, reference):
+        """Record element, just inserted before reference in the tree."""
+        self.elements.insert(self._position(id(reference)), element)
+        self._add(element)
+
+    def append(self, element):
+        """Record element, just inserted after every other indexed element."""
+        self.elements.append(element)
+        self._add(element)
+
+    def _add(self, element):
+        self._positions = None
+        self._entries[id(element)] = (element, '', '')
+        self.refresh(element)
+
+def _last_child_tag(container):
+    for child in reversed(container.contents):
+        if child.name:
+            return child
+    return None
+
+def _last_block_element(container):
+    """The last BLOCK_TAGS element under container in document order, or None."""
+    for child in reversed(container.contents):
+        if child.name:
+            last = _last_block_element(child)
+            if last is not None:
+                return last
+            if child.name in BLOCK_TAGS:
+                return child
+    return None
+
+def apply_mapped_changes(soup, user_content, mapping, changes, after_last_element=False):
+    """Apply tracked changes to user_content through a DOCX-HTML mapping.
+
+    The BLOCK_TAGS element table is built once and every mapping entry is
+    resolved against it. Deletions are applied first, then insertions, in
+    the order given: a deletion replaces its mapped element's content with
+    the text minus the deleted passage, and an insertion adds a <p> right
+    after its mapped element, or after the last child of user_content if
+    its paragraph is not mapped (or its element is gone). With
+    after_last_element that fallback goes after the last BLOCK_TAGS element
+    anywhere in user_content instead, as update-html-using-mapping.py
+    always did.
+    """
+    html_elements = user_content.find_all(BLOCK_TAGS)
+    para_to_html = {}
+    for mapping_entry in mapping['mapping']:
+        html_idx = mapping_entry['html_index']
+        if html_idx < len(html_elements):
+            para_to_html[mapping_entry['docx_index']] = html_elements[html_idx]
+
+    # Apply deletions
+    for deletion in changes['deletions']:
+        para_idx = deletion.get('paragraph_index')
+        deleted_text = deletion['text'].strip()
+
+        html_elem = para_to_html.get(para_idx) if para_idx is not None else None
+        if html_elem is not None:
+            elem_text = html_elem.get_text()
+            if deleted_text in elem_text:
+                html_elem.clear()
+                html_elem.string = elem_text.replace(deleted_text, '')
+                print(f"  🗑️  Deleted text from mapped paragraph {para_idx}")
+
+    # Apply insertions
+    for insertion in changes['insertions']:
+        para_idx = insertion.get('paragraph_index')
+        new_p = soup.new_tag('p')
+        new_p.string = insertion['text'].strip()
+
+        html_elem = para_to_html.get(para_idx) if para_idx is not None else None
+        if html_elem is not None and html_elem.parent is not None:
+            # Insert after the mapped HTML element (unless a deletion in an
+            # enclosing mapped element has removed it from the page)
+            html_elem.insert_after(new_p)
+            print(f"  📝 Inserted text after mapped paragraph {para_idx}")
+        else:
+            # Fallback: append to end of user_content
+            if after_last_element:
+                last_child = _last_block_element(user_content)
+            else:
+                last_child = _last_child_tag(user_content)
+            if last_child is not None:
+                last_child.insert_after(new_p)
+            else:
+                user_content.append(new_p)
+            print(f"  📝 Inserted text at end (no mapping for paragraph {para_idx})")
+
+def update_html_using_mapping(html_file_path, mapping, changes, after_last_element=False):
+    """Update an HTML file using the mapping to locate changes.
+
+    after_last_element is passed to apply_mapped_changes.
+    """
+    soup = load_html(html_file_path, round_trip=True)
+    user_content = soup.find('div', class_='user_content')
+
+    if not user_content:
+        raise ValueError("Could not find .user_content div in HTML file")
+
+    apply_mapped_changes(soup, user_content, mapping, changes, after_last_element)
+
+    with open(html_file_path, 'w', encoding='utf-8') as f:
+        f.write(str(soup))
+
+    return True
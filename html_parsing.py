@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Shared HTML loading for the course page scripts.
+
+Every script used to call BeautifulSoup(..., 'html.parser'). load_html and
+parse_html pick the parser in one place instead. The default is still
+html.parser: through BeautifulSoup, lxml was measured no faster on the
+course pages, and it builds a different tree from malformed markup. Set
+COURSE_HTML_PARSER (e.g. to lxml) to use another BeautifulSoup parser for
+read-only parsing; benchmark-course-corpus.py parse checks that it
+extracts the same content as html.parser.
+
+Callers that write the parsed document back out, or otherwise publish its
+serialization, pass round_trip=True and always get html.parser: lxml drops
+the whitespace after the doctype and wraps fragments in <html><body>, so
+its str(soup) is not byte-for-byte what html.parser produces.
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+
+PARSER_ENV = 'COURSE_HTML_PARSER'
+ROUND_TRIP_PARSER = 'html.parser'
+DEFAULT_PARSER = ROUND_TRIP_PARSER
+
+def read_parser():
+    """Parser used for read-only parsing: COURSE_HTML_PARSER or DEFAULT_PARSER."""
+    return os.environ.get(PARSER_ENV) or DEFAULT_PARSER
+
+def parse_html(markup, round_trip=False):
+    """Parse markup with the read-only parser, or html.parser for round_trip."""
+    parser = ROUND_TRIP_PARSER if round_trip else read_parser()
+    return BeautifulSoup(markup, parser)
+
+def load_html(html_file_path, round_trip=False):
+    """Read an HTML file and parse it with parse_html()."""
+    with open(html_file_path, 'r', encoding='utf-8') as f:
+        return parse_html(f.read(), round_trip=round_trip)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the Box and Canvas scripts.
+
+Calling requests.get/put/post directly opens a new connection (and TLS
+handshake) for every request. get_session() instead returns one
+process-wide requests.Session whose connection pools are kept alive and
+shared by every caller and thread, sized per host so the Box API can serve
+a parallel folder scan. The session also:
+
+- applies DEFAULT_TIMEOUT to requests that do not pass their own timeout;
+- asks for gzip-encoded responses (requests decodes them transparently);
+- retries connection failures, and 429/5xx responses to idempotent
+  requests (GET, PUT, DELETE, ...), with exponential backoff and jitter,
+  honouring a Retry-After header when the server sends one. POST is not
+  retried on a response, so a single-use OAuth code is never replayed.
+
+configure_session() mounts the same adapters on a session created
+elsewhere, such as the one canvasapi keeps for a Canvas object (canvasapi
+passes no timeout, so the adapters' default is what stops a stalled call).
+"""
+
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (10, 60)
+# Connections kept alive per host; hosts not listed get DEFAULT_POOL_SIZE
+POOL_SIZES = {
+    'api.box.com': 16,
+    'upload.box.com': 4,
+    'dl.boxcloud.com': 8,
+    'public.boxcloud.com': 8,
+}
+DEFAULT_POOL_SIZE = 8
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 30
+
+class JitteredRetry(Retry):
+    """urllib3 Retry whose backoff is capped at MAX_BACKOFF and scaled by 50-100%.
+
+    The jitter spreads out the retries of threads that were throttled together.
+    """
+
+    def get_backoff_time(self):
+        return min(MAX_BACKOFF, super().get_backoff_time()) * random.uniform(0.5, 1.0)
+
+def retry_policy(retries=MAX_RETRIES):
+    return JitteredRetry(
+        total=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests sent without one."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+def configure_session(session, pool_sizes=POOL_SIZES, retries=MAX_RETRIES, timeout=DEFAULT_TIMEOUT):
+    """Mount pooled, retrying adapters with a default timeout on session and ask for gzip; return it."""
+    retry = retry_policy(retries)
+    for scheme in ('https://', 'http://'):
+        session.mount(scheme, TimeoutHTTPAdapter(timeout, pool_maxsize=DEFAULT_POOL_SIZE, max_retries=retry))
+    for host, size in pool_sizes.items():
+        session.mount(f'https://{host}/', TimeoutHTTPAdapter(timeout, pool_maxsize=size, max_retries=retry))
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """The process-wide configured session, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = configure_session(requests.Session())
+    return _session
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+def put(url, **kwargs):
+    return get_session().put(url, **kwargs)
+
+def post(url, **kwargs):
+    return get_session().post(url, **kwargs)
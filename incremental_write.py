@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Write generated files only when their content actually changes.
+
+Regenerating a file with identical content still bumps its mtime and makes
+git, extract-canvas-links.py and the Pages build treat it as changed.
+write_if_changed compares the new bytes with what is on disk first.
+"""
+
+from pathlib import Path
+
+CREATED = 'created'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+def write_if_changed(path, content, encoding='utf-8'):
+    """Write content to path unless the file already holds exactly that.
+
+    Returns CREATED, UPDATED or UNCHANGED.
+    """
+    path = Path(path)
+    data = content.encode(encoding) if isinstance(content, str) else content
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return UNCHANGED
+        status = UPDATED
+    except FileNotFoundError:
+        status = CREATED
+    path.write_bytes(data)
+    return status
+
+class WriteStats:
+    """Per-run counts of created, updated and unchanged files."""
+
+    def __init__(self):
+        self.counts = {CREATED: 0, UPDATED: 0, UNCHANGED: 0}
+
+    def write(self, path, content, encoding='utf-8'):
+        """write_if_changed, counting the result."""
+        status = write_if_changed(path, content, encoding)
+        self.counts[status] += 1
+        return status
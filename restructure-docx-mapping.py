@@ -7,13 +7,16 @@ and ordered lists of Learning Modules based on HTML Learning Activities sections
 import json
 import re
 from pathlib import Path
-from bs4 import BeautifulSoup
-from html import unescape
+
+from course_pages import CoursePageCache
 
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 BOX_FILE_IDS_JSON = COURSE_DIR / "box-file-ids.json"
 OUTPUT_FILE = COURSE_DIR / "DOCX-HTML-MAPPING.md"
 HTML_BASE_DIR = COURSE_DIR / "WINTER 25-26 COURSE UPDATES"
+PAGE_CACHE_FILE = COURSE_DIR / ".course-page-cache.json"
+
+_page_cache = CoursePageCache(PAGE_CACHE_FILE)
 
 # Module structure mapping
 MODULE_STRUCTURE = {
@@ -141,96 +144,7 @@ def find_docx_by_title(title, file_id_map, path_to_id):
 def extract_learning_activities(html_file_path):
     """Extract Learning Activities links from HTML file."""
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        soup = BeautifulSoup(content, 'html.parser')
-
-        # Find Learning Activities section
-        learning_activities = []
-
-        # Try h2 tags first
-        h2_tags = soup.find_all('h2')
-        for h2 in h2_tags:
-            if h2.get_text().strip() == 'Learning Activities':
-                # Find the next ul after this h2 (could be sibling or in next div)
-                next_ul = h2.find_next_sibling('ul')
-
-                # If not found as sibling, check if h2 is in a div and ul is next sibling of that div
-                if not next_ul:
-                    parent = h2.parent
-                    if parent and parent.name == 'div':
-                        next_ul = parent.find_next_sibling('ul')
-
-                # If still not found, search within the parent div
-                if not next_ul:
-                    parent = h2.parent
-                    if parent:
-                        next_ul = parent.find('ul')
-
-                # Last resort: find any ul that comes after this h2
-                if not next_ul:
-                    for sibling in h2.next_siblings:
-                        if hasattr(sibling, 'name') and sibling.name == 'ul':
-                            next_ul = sibling
-                            break
-
-                if next_ul:
-                    for li in next_ul.find_all('li', recursive=False):
-                        link = li.find('a')
-                        if link:
-                            title = link.get('title', '')
-                            if not title:
-                                # Try to get text from strong tag or link text
-                                strong = link.find('strong')
-                                if strong:
-                                    title = strong.get_text().strip()
-                                else:
-                                    title = link.get_text().strip()
-
-                            # Clean up title - remove extra info like "| Video (6:02) | Guide"
-                            title = re.sub(r'\s*\|\s*.*$', '', title).strip()
-                            # Also remove HTML entities and clean up
-                            title = unescape(title)
-                            learning_activities.append(title)
-
-        # If no h2 found, try p tags
-        if not learning_activities:
-            p_tags = soup.find_all('p')
-            for p in p_tags:
-                if 'Learning Activities' in p.get_text():
-                    # Find the next ul after this p
-                    next_ul = p.find_next_sibling('ul')
-                    if not next_ul:
-                        # Check if p is in a div and ul is in the next sibling div
-                        parent = p.parent
-                        if parent and parent.name == 'div':
-                            # Check next sibling div
-                            next_div = parent.find_next_sibling('div')
-                            if next_div:
-                                next_ul = next_div.find('ul')
-                            # Also check if ul is next sibling of parent div
-                            if not next_ul:
-                                next_ul = parent.find_next_sibling('ul')
-
-                    if next_ul:
-                        for li in next_ul.find_all('li', recursive=False):
-                            link = li.find('a')
-                            if link:
-                                title = link.get('title', '')
-                                if not title:
-                                    strong = link.find('strong')
-                                    if strong:
-                                        title = strong.get_text().strip()
-                                    else:
-                                        title = link.get_text().strip()
-
-                                title = re.sub(r'\s*\|\s*.*$', '', title).strip()
-                                title = unescape(title)
-                                learning_activities.append(title)
-                    break
-
-        return learning_activities
+        return list(_page_cache.get(html_file_path).learning_activities)
     except Exception as e:
         print(f"  ⚠️  Error reading {html_file_path.name}: {e}")
         return []
@@ -418,6 +332,8 @@ def main():
         output_lines.append("---")
         output_lines.append("")
 
+    _page_cache.save()
+
     # Write output
     print(f"\n💾 Writing to {OUTPUT_FILE.name}...")
     with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
@@ -6,9 +6,10 @@ Tests with Course Orientation DOCX file first
 
 import os
 import json
-import requests
 from pathlib import Path
 
+import http_client
+
 BOX_API_BASE_URL = 'https://api.box.com/2.0'
 BOX_API_CONFIG_FILE = Path('.box-api-config.json')
 
@@ -46,7 +47,7 @@ def get_file_info(access_token, file_id):
         'fields': 'id,name,shared_link,permissions'
     }
 
-    response = requests.get(url, headers=headers, params=params)
+    response = http_client.get(url, headers=headers, params=params)
     return response
 
 def update_shared_link(access_token, file_id, access_level='open', can_edit=False, can_download=True):
@@ -70,7 +71,7 @@ def update_shared_link(access_token, file_id, access_level='open', can_edit=Fals
         }
     }
 
-    response = requests.put(url, headers=headers, json=payload)
+    response = http_client.put(url, headers=headers, json=payload)
     return response
 
 def main():
@@ -2,22 +2,71 @@
 """
 Simple API endpoint for updating Canvas from DOCX tracked changes.
 Can be run as a local server or used with serverless functions.
+
+POST /update-canvas-api queues the update and answers 202 with a job ID
+straight away; the update runs on a worker pool (UPDATE_CANVAS_WORKERS
+concurrent updates, default 2). Poll GET /jobs/<id> for the job's status
+and GET /jobs/<id>/result for the update's result once it has finished.
+Requests for a page whose update is already queued or running share that
+job; a new update waits UPDATE_CANVAS_DEBOUNCE seconds (default 2) before
+it starts, so a burst of clicks runs the pipeline once.
+
+The update pipeline (update-canvas-from-docx.py) runs in worker
+processes, one per worker thread. Each imports the script and loads the
+config once, then serves update after update, so its libraries, the
+config and the Canvas client stay loaded between requests. An update that
+takes longer than UPDATE_TIMEOUT has its process killed, and a process
+that crashes only fails its own job; the next update starts a new one.
+
+The worker processes are spawned, so each re-imports this file (as
+__mp_main__). Everything they must not rebuild - the Flask app, the job
+queue and its threads, the worker processes - is set up by create_app(),
+which only runs when the file is run as the server.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, url_for
 from flask_cors import CORS
-import subprocess
-import json
+import os
 from pathlib import Path
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for GitHub Pages
+from update_jobs import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_MAX_WORKERS, JobQueue, JobTimeout, WorkerProcesses
 
 UPDATE_SCRIPT = Path(__file__).parent / "update-canvas-from-docx.py"
+UPDATE_TIMEOUT = 300  # 5 minute timeout
+# Extra seconds the job deadline allows for killing a timed-out update
+JOB_DEADLINE_GRACE = 30
+MAX_CONCURRENT_UPDATES = int(os.getenv('UPDATE_CANVAS_WORKERS', DEFAULT_MAX_WORKERS))
+UPDATE_DEBOUNCE_SECONDS = float(os.getenv('UPDATE_CANVAS_DEBOUNCE', DEFAULT_DEBOUNCE_SECONDS))
+
+# Set by create_app()
+updaters = None
+jobs = None
+
+def run_update(params):
+    """Run the update pipeline for one job; return (payload, http_status)."""
+    try:
+        result = updaters.call((params['box_file_id'], params['canvas_page_slug']), timeout=UPDATE_TIMEOUT)
+    except JobTimeout:
+        return {
+            'success': False,
+            'message': 'Update timed out after 5 minutes'
+        }, 504
+    return result, 200 if result.get('success') else 500
+
+def job_links(job):
+    return {
+        'status_url': url_for('job_status', job_id=job.id),
+        'result_url': url_for('job_result', job_id=job.id),
+    }
+
+def job_not_found(job_id):
+    return jsonify({
+        'success': False,
+        'message': f'Unknown or expired job: {job_id}'
+    }), 404
 
-@app.route('/update-canvas-api', methods=['POST'])
 def update_canvas():
-    """Handle update canvas request."""
+    """Queue an update canvas request; respond 202 with the job ID."""
     try:
         data = request.json
         box_file_id = data.get('box_file_id')
@@ -30,62 +79,72 @@ def update_canvas():
                 'message': 'Missing required parameters: box_file_id, canvas_page_slug'
             }), 400
 
-        # Run the update script with environment variables
-        import os
-        env = os.environ.copy()
-        # Pass Box token if available
-        box_token = os.getenv('BOX_DEVELOPER_TOKEN')
-        if box_token:
-            env['BOX_DEVELOPER_TOKEN'] = box_token
-
-        result = subprocess.run(
-            [
-                'python3',
-                str(UPDATE_SCRIPT),
-                '--box-file-id', box_file_id,
-                '--canvas-page-slug', canvas_page_slug
-            ],
-            capture_output=True,
-            text=True,
-            timeout=300,  # 5 minute timeout
-            env=env  # Pass environment to subprocess
-        )
-
-        if result.returncode == 0:
-            # Parse JSON output from script
-            try:
-                output = json.loads(result.stdout)
-                return jsonify(output)
-            except json.JSONDecodeError:
-                # If output isn't JSON, return success with stdout
-                return jsonify({
-                    'success': True,
-                    'message': result.stdout.strip() or 'Canvas updated successfully',
-                    'timestamp': __import__('datetime').datetime.now().isoformat()
-                })
+        # One run per Box file and Canvas page at a time
+        job, shared = jobs.submit({
+            'box_file_id': box_file_id,
+            'canvas_page_slug': canvas_page_slug,
+            'page_name': page_name,
+        }, key=(box_file_id, canvas_page_slug))
+        links = job_links(job)
+        if shared:
+            message = f'Update for {page_name or canvas_page_slug} already {job.status}; sharing its result'
         else:
-            return jsonify({
-                'success': False,
-                'message': f'Update failed: {result.stderr}'
-            }), 500
+            message = f'Update queued for {page_name or canvas_page_slug}'
+        response = jsonify({
+            'success': True,
+            'message': message,
+            'job_id': job.id,
+            'status': job.status,
+            'shared': shared,
+            **links
+        })
+        response.headers['Location'] = links['status_url']
+        return response, 202
 
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            'success': False,
-            'message': 'Update timed out after 5 minutes'
-        }), 504
     except Exception as e:
         return jsonify({
             'success': False,
             'message': f'Error: {str(e)}'
         }), 500
 
-@app.route('/health', methods=['GET'])
+def job_status(job_id):
+    """Status of a queued update job."""
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    return jsonify({**job.to_dict(), **job_links(job)})
+
+def job_result(job_id):
+    """Result of a finished job (with the update's status code), or 202 while it is pending."""
+    job = jobs.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    if not job.finished:
+        return jsonify({**job.to_dict(), **job_links(job)}), 202
+    return jsonify(job.result), job.http_status
+
 def health():
     """Health check endpoint."""
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'jobs': jobs.counts(), 'workers': MAX_CONCURRENT_UPDATES})
+
+def create_app():
+    """Build the Flask app and the update job queue.
+
+    The worker processes start on the first update, not here.
+    """
+    global updaters, jobs
+    updaters = WorkerProcesses(UPDATE_SCRIPT, 'update_canvas_from_docx', initializer='load_config')
+    jobs = JobQueue(run_update, max_workers=MAX_CONCURRENT_UPDATES, debounce=UPDATE_DEBOUNCE_SECONDS,
+                    deadline=UPDATE_TIMEOUT + JOB_DEADLINE_GRACE)
+
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for GitHub Pages
+    app.add_url_rule('/update-canvas-api', view_func=update_canvas, methods=['POST'])
+    app.add_url_rule('/jobs/<job_id>', view_func=job_status, methods=['GET'])
+    app.add_url_rule('/jobs/<job_id>/result', view_func=job_result, methods=['GET'])
+    app.add_url_rule('/health', view_func=health, methods=['GET'])
+    return app
 
 if __name__ == '__main__':
     # Run on localhost for development
-    app.run(host='127.0.0.1', port=5000, debug=True)
-
+    create_app().run(host='127.0.0.1', port=5000, debug=True)
@@ -10,40 +10,54 @@ This script:
 5. Returns success message with timestamp
 """
 
+import fcntl
 import os
 import sys
 import json
-import zipfile
-import io
 import re
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from html import escape
-from xml.etree import ElementTree as ET
-import requests
 import toml
-from bs4 import BeautifulSoup
 
 # Add canvas_grab to path
 sys.path.insert(0, '/Users/a00288946/Projects/canvas_grab')
 
 from canvasapi import Canvas
 
+from box_files import BoxFileCache, download_file_cached, download_file_content
+from canvas_pages import use_pooled_session
+from docx_document import DOCX_CACHE_DIR, DocxDocument
+from html_changes import BLOCK_TAGS, HtmlElementIndex, update_html_using_mapping
+from html_parsing import load_html
+
 # Configuration
 COURSE_DIR = Path("/Users/a00288946/Projects/canvas_2879")
 CONFIG_FILE = COURSE_DIR / "config.toml"
 HTML_DIR = COURSE_DIR / "WINTER 25-26 COURSE UPDATES"
-BOX_API_BASE = "https://api.box.com/2.0"
+BOX_CACHE_DIR = COURSE_DIR / ".box-cache"
 
 # Box file ID for Course Orientation
 COURSE_ORIENTATION_BOX_FILE_ID = "2072202817948"
 COURSE_ORIENTATION_CANVAS_PAGE_SLUG = "course-orientation"
 COURSE_ORIENTATION_HTML_FILE = HTML_DIR / "1 Start Here" / "Course Orientation.html"
 
+# Config and Canvas clients kept between update_canvas_from_docx() calls
+# when the pipeline runs inside a long-lived process (update-canvas-api.py)
+_config_cache = {}
+_canvas_courses = {}
+_canvas_lock = threading.Lock()
+
 def load_config():
-    """Load configuration from config.toml."""
-    with open(CONFIG_FILE, 'r') as f:
-        return toml.load(f)
+    """Load configuration from config.toml, re-reading it only when it changes."""
+    mtime = CONFIG_FILE.stat().st_mtime_ns
+    if _config_cache.get('mtime') != mtime:
+        with open(CONFIG_FILE, 'r') as f:
+            _config_cache['config'] = toml.load(f)
+        _config_cache['mtime'] = mtime
+    return _config_cache['config']
 
 def get_box_access_token():
     """Get Box access token from environment or config.
@@ -75,63 +89,27 @@ def get_box_access_token():
 
     return None, None
 
-def download_docx_from_box(file_id, access_token):
-    """Download DOCX file from Box."""
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-    }
+def download_docx_from_box(file_id, access_token, use_cache=True):
+    """Download DOCX file from Box.
 
-    # First, try to get file info to check permissions
-    info_url = f'{BOX_API_BASE}/files/{file_id}'
-    info_response = requests.get(info_url, headers=headers)
-    info_response.raise_for_status()
-    file_info = info_response.json()
-
-    # Try to get download URL from file info
-    download_url = None
-    if 'shared_link' in file_info and file_info['shared_link']:
-        # If file has a shared link, try using it
-        shared_link = file_info['shared_link']
-        if shared_link.get('download_url'):
-            download_url = shared_link['download_url']
-
-    # Try direct content download first
-    content_url = f'{BOX_API_BASE}/files/{file_id}/content'
-    try:
-        response = requests.get(content_url, headers=headers, stream=True)
-        response.raise_for_status()
-        return response.content
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 403:
-            # If 403, try using download_url if available
-            if download_url:
-                # Download from shared link (may need to handle authentication differently)
-                response = requests.get(download_url, stream=True)
-                response.raise_for_status()
-                return response.content
-            else:
-                # Try alternative: get a temporary download URL
-                download_url_endpoint = f'{BOX_API_BASE}/files/{file_id}?fields=download_url'
-                download_response = requests.get(download_url_endpoint, headers=headers)
-                if download_response.status_code == 200:
-                    download_data = download_response.json()
-                    if 'download_url' in download_data:
-                        response = requests.get(download_data['download_url'], stream=True)
-                        response.raise_for_status()
-                        return response.content
-
-                # If all else fails, raise the original error
-                raise Exception(f"403 Forbidden: Token does not have permission to download file content. "
-                              f"You may need to grant 'Read all files and folders' permission to your Box app, "
-                              f"or use a token with higher permissions.")
-        else:
-            raise
+    The content is streamed into a spooled temporary file rather than held
+    in memory; returns a seekable file object ready for zipfile, which the
+    caller closes. With use_cache, an unchanged file is served from
+    BOX_CACHE_DIR after a metadata check instead of being downloaded again.
+    """
+    if not use_cache:
+        docx_file, _ = download_file_content(file_id, access_token)
+        return docx_file
+    docx_file, _, from_cache = download_file_cached(file_id, access_token, BoxFileCache(BOX_CACHE_DIR))
+    if from_cache:
+        print("   ♻️  Box file unchanged, using cached copy")
+    return docx_file
 
 def extract_tracked_changes_from_docx(docx_content, include_paragraph_index=False):
     """Extract tracked changes (insertions and deletions) from DOCX file.
 
     Args:
-        docx_content: DOCX file content as bytes
+        docx_content: DOCX file content as bytes or a seekable file object
         include_paragraph_index: If True, include the paragraph index for each change
 
     Returns:
@@ -142,226 +120,49 @@ def extract_tracked_changes_from_docx(docx_content, include_paragraph_index=Fals
         'deletions': []
     }
 
-    # DOCX is a ZIP file
-    with zipfile.ZipFile(io.BytesIO(docx_content)) as docx:
-        # Extract main document XML
-        document_xml = docx.read('word/document.xml')
-        root = ET.fromstring(document_xml)
-
-        # Define namespaces
-        namespaces = {
-            'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
-        }
-
-        def extract_text_from_element(elem):
-            """Extract all text from an element and its children."""
-            texts = []
-            for t_elem in elem.findall('.//w:t', namespaces):
-                if t_elem.text:
-                    texts.append(t_elem.text)
-            return ' '.join(texts)
-
-        def get_context_around_element(elem, root, namespaces, context_length=100):
-            """Get text context before and after an element to help locate it in HTML."""
-            # Find parent paragraph by searching up the tree
-            parent_p = None
-            current = elem
-            for _ in range(10):  # Limit search depth
-                if current is None:
-                    break
-                if current.tag == f'{{{namespaces["w"]}}}p':
-                    parent_p = current
-                    break
-                current = current.getparent() if hasattr(current, 'getparent') else None
-                # Alternative: search for parent in tree
-                if current is None:
-                    # Search for paragraph containing this element
-                    for p in root.findall('.//w:p', namespaces):
-                        if elem in p.iter():
-                            parent_p = p
-                            break
-                    break
-
-            if parent_p is None:
-                return None, None
-
-            # Get text before the insertion in the same paragraph
-            before_text = ""
-            for sibling in list(parent_p):
-                if sibling == elem:
-                    break
-                # Extract text from runs (w:r) and other text-containing elements
-                if sibling.tag == f'{{{namespaces["w"]}}}r':
-                    for t in sibling.findall('.//w:t', namespaces):
-                        if t.text:
-                            before_text += t.text
-                elif sibling.tag == f'{{{namespaces["w"]}}}ins':
-                    # Skip other insertions, but could include their text for context
-                    continue
-                # Also check for text in other elements
-                for t in sibling.findall('.//w:t', namespaces):
-                    if t.text:
-                        before_text += t.text
-
-            # Get text after the insertion in the same paragraph
-            after_text = ""
-            found_elem = False
-            for sibling in list(parent_p):
-                if sibling == elem:
-                    found_elem = True
-                    continue
-                if found_elem:
-                    if sibling.tag == f'{{{namespaces["w"]}}}r':
-                        for t in sibling.findall('.//w:t', namespaces):
-                            if t.text:
-                                after_text += t.text
-                    elif sibling.tag == f'{{{namespaces["w"]}}}ins':
-                        # Skip other insertions
-                        continue
-                    # Extract text from any text elements
-                    for t in sibling.findall('.//w:t', namespaces):
-                        if t.text:
-                            after_text += t.text
-                    if after_text:
-                        break  # Stop after getting some context
-
-            # Limit context length and clean up
-            before_text = before_text.strip()
-            if len(before_text) > context_length:
-                before_text = '...' + before_text[-context_length:]
-
-            after_text = after_text.strip()
-            if len(after_text) > context_length:
-                after_text = after_text[:context_length] + '...'
-
-            return before_text, after_text
-
-        # Find all paragraphs first (for paragraph index tracking)
-        all_paragraphs = root.findall('.//w:p', namespaces)
-
-        # Find all insertions (w:ins)
-        ins_elements = root.findall('.//w:ins', namespaces)
-        print(f"  📝 Found {len(ins_elements)} w:ins (insertion) elements in XML")
-
-        for ins in ins_elements:
-            text = extract_text_from_element(ins)
-            if text.strip():
-                # Find which paragraph contains this insertion
-                para_index = None
-                if include_paragraph_index:
-                    for idx, para in enumerate(all_paragraphs):
-                        if ins in para.iter():
-                            para_index = idx
-                            break
-
-                # Get context to help locate insertion point in HTML
-                before_context, after_context = get_context_around_element(ins, root, namespaces)
-
-                changes['insertions'].append({
-                    'text': text,
-                    'author': ins.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}author', 'Unknown'),
-                    'date': ins.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}date', ''),
-                    'before_context': before_context,  # Text that comes before this insertion
-                    'after_context': after_context,     # Text that comes after this insertion
-                    'paragraph_index': para_index        # Index of paragraph containing this insertion
-                })
-
-        # Find all deletions (w:del)
-        del_elements = root.findall('.//w:del', namespaces)
-        print(f"  🗑️  Found {len(del_elements)} w:del (deletion) elements in XML")
-
-        for dele in del_elements:
-            text = extract_text_from_element(dele)
-            if text.strip():
-                # Find which paragraph contains this deletion
-                para_index = None
-                if include_paragraph_index:
-                    for idx, para in enumerate(all_paragraphs):
-                        if dele in para.iter():
-                            para_index = idx
-                            break
-
-                changes['deletions'].append({
-                    'text': text,
-                    'author': dele.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}author', 'Unknown'),
-                    'date': dele.get('{http://schemas.openxmlformats.org/wordprocessingml/2006/main}date', ''),
-                    'paragraph_index': para_index  # Index of paragraph containing this deletion
-                })
-
-        # Additional debugging: Check for any revision-related elements
-        if len(ins_elements) == 0 and len(del_elements) == 0:
-            print("  ℹ️  No tracked changes found. This could mean:")
-            print("     - Track Changes is not enabled in Word")
-            print("     - The document has no edits with tracking enabled")
-            print("     - All changes have been accepted/rejected")
+    # One cached analysis per DOCX version: each paragraph comes with its
+    # w:ins/w:del elements and the text around them
+    document = DocxDocument.load(docx_content, DOCX_CACHE_DIR)
+    insertions = document.insertions
+    deletions = document.deletions
+
+    # Find all insertions (w:ins)
+    print(f"  📝 Found {len(insertions)} w:ins (insertion) elements in XML")
+
+    for ins in insertions:
+        text = ins.text
+        if text.strip():
+            changes['insertions'].append({
+                'text': text,
+                'author': ins.author,
+                'date': ins.date,
+                'before_context': ins.before_context,  # Text that comes before this insertion
+                'after_context': ins.after_context,     # Text that comes after this insertion
+                'paragraph_index': ins.paragraph_index if include_paragraph_index else None
+            })
+
+    # Find all deletions (w:del)
+    print(f"  🗑️  Found {len(deletions)} w:del (deletion) elements in XML")
+
+    for dele in deletions:
+        text = dele.text
+        if text.strip():
+            changes['deletions'].append({
+                'text': text,
+                'author': dele.author,
+                'date': dele.date,
+                'paragraph_index': dele.paragraph_index if include_paragraph_index else None
+            })
+
+    # Additional debugging: Check for any revision-related elements
+    if not insertions and not deletions:
+        print("  ℹ️  No tracked changes found. This could mean:")
+        print("     - Track Changes is not enabled in Word")
+        print("     - The document has no edits with tracking enabled")
+        print("     - All changes have been accepted/rejected")
 
     return changes
 
-def update_html_using_mapping(html_file_path, mapping, changes):
-    """Update HTML file using the mapping to locate changes."""
-    # Read HTML
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    soup = BeautifulSoup(html_content, 'html.parser')
-    user_content = soup.find('div', class_='user_content')
-
-    if not user_content:
-        raise ValueError("Could not find .user_content div in HTML file")
-
-    # Create a lookup: paragraph_index -> HTML element
-    para_to_html = {}
-    html_elements = list(user_content.find_all(['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']))
-
-    for mapping_entry in mapping['mapping']:
-        docx_idx = mapping_entry['docx_index']
-        html_idx = mapping_entry['html_index']
-        if html_idx < len(html_elements):
-            para_to_html[docx_idx] = html_elements[html_idx]
-
-    # Apply deletions
-    for deletion in changes['deletions']:
-        para_idx = deletion.get('paragraph_index')
-        deleted_text = deletion['text'].strip()
-
-        if para_idx is not None and para_idx in para_to_html:
-            html_elem = para_to_html[para_idx]
-            elem_text = html_elem.get_text()
-            if deleted_text in elem_text:
-                new_text = elem_text.replace(deleted_text, '')
-                html_elem.clear()
-                html_elem.string = new_text
-                print(f"  🗑️  Deleted text from mapped paragraph {para_idx}")
-
-    # Apply insertions
-    for insertion in changes['insertions']:
-        para_idx = insertion.get('paragraph_index')
-        new_text = insertion['text'].strip()
-
-        if para_idx is not None and para_idx in para_to_html:
-            # Insert after the mapped HTML element
-            html_elem = para_to_html[para_idx]
-            new_p = soup.new_tag('p')
-            new_p.string = new_text
-            html_elem.insert_after(new_p)
-            print(f"  📝 Inserted text after mapped paragraph {para_idx}")
-        else:
-            # Fallback: append to end of user_content
-            new_p = soup.new_tag('p')
-            new_p.string = new_text
-            direct_children = [child for child in user_content.children if hasattr(child, 'name') and child.name]
-            if direct_children:
-                direct_children[-1].insert_after(new_p)
-            else:
-                user_content.append(new_p)
-            print(f"  📝 Inserted text at end (no mapping for paragraph {para_idx})")
-
-    # Write updated HTML
-    with open(html_file_path, 'w', encoding='utf-8') as f:
-        f.write(str(soup))
-
-    return True
-
 def update_html_with_changes(html_file_path, changes):
     """Update HTML file based on tracked changes.
 
@@ -371,16 +172,17 @@ def update_html_with_changes(html_file_path, changes):
     if not html_file_path.exists():
         raise FileNotFoundError(f"HTML file not found: {html_file_path}")
 
-    # Read HTML file
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Read HTML file (html.parser, as the whole document is written back)
+    soup = load_html(html_file_path, round_trip=True)
     user_content = soup.find('div', class_='user_content')
 
     if not user_content:
         raise ValueError("Could not find .user_content div in HTML file")
 
+    # Index the text of every element once; each change then only looks at
+    # the elements that share its words
+    index = HtmlElementIndex(user_content)
+
     # Apply deletions: Remove text that matches deleted content
     # Look for exact text matches in paragraphs and other elements
     for deletion in changes['deletions']:
@@ -388,16 +190,19 @@ def update_html_with_changes(html_file_path, changes):
         if not deleted_text:
             continue
 
-        # Find all text nodes and check if they contain the deleted text
-        for element in user_content.find_all(['p', 'li', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        # Check the elements whose text contains the deleted text
+        for element in index.containing(deleted_text, case_sensitive=True):
             if element.string and deleted_text in element.string:
                 # Replace the deleted text with empty string
                 element.string = element.string.replace(deleted_text, '')
+                index.refresh(element)
             elif element.get_text() and deleted_text in element.get_text():
                 # For elements with nested tags, replace in all text nodes
                 for text_node in element.find_all(string=True):
                     if deleted_text in text_node:
+                        parent = text_node.parent
                         text_node.replace_with(text_node.replace(deleted_text, ''))
+                        index.refresh(parent)
 
     # Apply insertions: Add new text as paragraphs
     # Try to match context to insert at the correct location
@@ -416,17 +221,25 @@ def update_html_with_changes(html_file_path, changes):
         after_context = insertion.get('after_context', '').strip()
 
         if before_context or after_context:
-            # Search for elements containing the context text
-            for element in user_content.find_all(['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-                element_text = element.get_text().strip()
+            # Only elements containing one of the context strings can match
+            candidates = []
+            if after_context:
+                candidates += index.containing(after_context, tags=BLOCK_TAGS)
+            if before_context:
+                candidates += index.containing(before_context, tags=BLOCK_TAGS)
+            if after_context and before_context:
+                candidates = index.in_document_order(candidates)
+
+            for element in candidates:
+                element_text = index.lower_text(element)
 
                 # Try to find element that contains the "after" context
                 # This means the insertion should go BEFORE this element
-                if after_context and after_context.lower() in element_text.lower():
+                if after_context and after_context.lower() in element_text:
                     # Check if before_context also matches (for more precision)
                     if before_context:
                         # Look for the element that comes before this one
-                        prev_elem = element.find_previous_sibling(['p', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+                        prev_elem = element.find_previous_sibling(BLOCK_TAGS)
                         if prev_elem and before_context.lower() in prev_elem.get_text().lower():
                             insertion_point = element
                             break
@@ -436,7 +249,7 @@ def update_html_with_changes(html_file_path, changes):
 
                 # Alternative: find element containing "before" context
                 # Insertion should go AFTER this element
-                elif before_context and before_context.lower() in element_text.lower():
+                elif before_context and before_context.lower() in element_text:
                     insertion_point = element
                     break
 
@@ -444,6 +257,7 @@ def update_html_with_changes(html_file_path, changes):
         if insertion_point:
             print(f"  📍 Found insertion point using context: '{before_context[:30]}...' -> '{after_context[:30]}...'")
             insertion_point.insert_before(new_p)
+            index.insert_before(new_p, insertion_point)
         else:
             # Fallback: Find the last element inside user_content to append after
             # This ensures the new paragraph is INSIDE user_content, not outside
@@ -461,6 +275,7 @@ def update_html_with_changes(html_file_path, changes):
             else:
                 # Final fallback: append directly to user_content
                 user_content.append(new_p)
+            index.append(new_p)
             print(f"  📍 No context match found, appending to end of user_content")
 
     # Write updated HTML
@@ -469,25 +284,34 @@ def update_html_with_changes(html_file_path, changes):
 
     return True
 
-def push_to_canvas(html_file_path, canvas_page_slug, config):
-    """Push updated HTML content to Canvas."""
-    # Initialize Canvas API
+def get_canvas_course(config):
+    """Return the configured Canvas course.
+
+    The course (and the HTTP session of its Canvas client) is created once
+    per process and configuration, then shared by every update.
+    """
     canvas_url = config['endpoint']['endpoint']
     canvas_token = config['endpoint']['api_key']
     course_id = config['course_filter']['per_filter']['course_id'][0]
 
-    canvas = Canvas(canvas_url, canvas_token)
-    course = canvas.get_course(course_id)
+    key = (canvas_url, canvas_token, course_id)
+    with _canvas_lock:
+        course = _canvas_courses.get(key)
+        if course is None:
+            canvas = use_pooled_session(Canvas(canvas_url, canvas_token))
+            course = _canvas_courses[key] = canvas.get_course(course_id)
+    return course
+
+def push_to_canvas(html_file_path, canvas_page_slug, config):
+    """Push updated HTML content to Canvas."""
+    course = get_canvas_course(config)
 
     # Get the page
     page = course.get_page(canvas_page_slug)
 
-    # Read updated HTML content
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-
-    # Extract body content from HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
+    # Read updated HTML content and extract the body (html.parser, so the
+    # published markup is exactly what was written locally)
+    soup = load_html(html_file_path, round_trip=True)
     user_content_div = soup.find('div', class_='user_content')
 
     if not user_content_div:
@@ -501,19 +325,31 @@ def push_to_canvas(html_file_path, canvas_page_slug, config):
 
     return True
 
-def main():
-    """Main function to update Canvas from DOCX tracked changes."""
-    import argparse
-
-    parser = argparse.ArgumentParser(description='Update Canvas page from DOCX tracked changes')
-    parser.add_argument('--box-file-id', type=str, default=COURSE_ORIENTATION_BOX_FILE_ID,
-                       help='Box file ID')
-    parser.add_argument('--canvas-page-slug', type=str, default=COURSE_ORIENTATION_CANVAS_PAGE_SLUG,
-                       help='Canvas page URL slug')
-    parser.add_argument('--html-file', type=str, default=str(COURSE_ORIENTATION_HTML_FILE),
-                       help='Path to local HTML file')
-    args = parser.parse_args()
+@contextmanager
+def html_file_lock(html_file_path):
+    """Hold an exclusive lock on an HTML file while it is updated and pushed.
 
+    Updates for different Box files or Canvas pages can target the same
+    HTML file (by default every one writes Course Orientation.html), so
+    concurrent runs - the API's worker processes or a manual run - take
+    turns. The lock is taken on a hidden .lock file beside the HTML file;
+    the OS releases it if the process dies.
+    """
+    html_file_path = Path(html_file_path).resolve()
+    lock_path = html_file_path.with_name(f'.{html_file_path.name}.lock')
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # closing the file releases the lock
+
+def update_canvas_from_docx(box_file_id, canvas_page_slug, html_file=COURSE_ORIENTATION_HTML_FILE,
+                            use_cache=True):
+    """Apply a Box DOCX's tracked changes to the local HTML and push it to Canvas.
+
+    Returns a result dict with success, message and timestamp (and change
+    counts on success); failures are reported in the dict, not raised.
+    update-canvas-api.py calls this in its worker processes for every
+    queued update.
+    """
     try:
         # Load configuration
         config = load_config()
@@ -528,19 +364,19 @@ def main():
         else:
             print(f"⚠️  Using Developer Token (may have limited permissions)")
 
-        print("📥 Downloading DOCX from Box...")
-        docx_content = download_docx_from_box(args.box_file_id, box_token)
-
         # Determine HTML file path
-        html_file_path = Path(args.html_file)
+        html_file_path = Path(html_file)
 
         # Check if mapping file exists
         mapping_file = html_file_path.parent / f"{html_file_path.stem}.mapping.json"
         use_mapping = mapping_file.exists()
 
-        # Extract tracked changes with paragraph indices if mapping exists
-        print("🔍 Extracting tracked changes...")
-        changes = extract_tracked_changes_from_docx(docx_content, include_paragraph_index=use_mapping)
+        print("📥 Downloading DOCX from Box...")
+        # Closed once the changes are read, not left to the garbage collector
+        with download_docx_from_box(box_file_id, box_token, use_cache=use_cache) as docx_content:
+            # Extract tracked changes with paragraph indices if mapping exists
+            print("🔍 Extracting tracked changes...")
+            changes = extract_tracked_changes_from_docx(docx_content, include_paragraph_index=use_mapping)
 
         if use_mapping:
             print(f"  📖 Mapping file found: {mapping_file.name}")
@@ -555,19 +391,20 @@ def main():
                 'timestamp': datetime.now().isoformat()
             }
 
-        # Update HTML using mapping if available, otherwise use context-based approach
-        if use_mapping:
-            print(f"📝 Updating local HTML file using mapping...")
-            import json
-            with open(mapping_file, 'r', encoding='utf-8') as f:
-                mapping = json.load(f)
-            update_html_using_mapping(html_file_path, mapping, changes)
-        else:
-            print(f"📝 Updating local HTML file (context-based)...")
-            update_html_with_changes(html_file_path, changes)
+        # One update at a time per HTML file, from editing it to pushing it
+        with html_file_lock(html_file_path):
+            # Update HTML using mapping if available, otherwise use context-based approach
+            if use_mapping:
+                print(f"📝 Updating local HTML file using mapping...")
+                with open(mapping_file, 'r', encoding='utf-8') as f:
+                    mapping = json.load(f)
+                update_html_using_mapping(html_file_path, mapping, changes)
+            else:
+                print(f"📝 Updating local HTML file (context-based)...")
+                update_html_with_changes(html_file_path, changes)
 
-        print("🚀 Pushing changes to Canvas...")
-        push_to_canvas(html_file_path, args.canvas_page_slug, config)
+            print("🚀 Pushing changes to Canvas...")
+            push_to_canvas(html_file_path, canvas_page_slug, config)
 
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         message = f'Canvas page updated successfully at {timestamp}. Applied {len(changes["insertions"])} insertions and {len(changes["deletions"])} deletions.'
@@ -593,6 +430,24 @@ def main():
             'timestamp': datetime.now().isoformat()
         }
 
+def main():
+    """Main function to update Canvas from DOCX tracked changes."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Update Canvas page from DOCX tracked changes')
+    parser.add_argument('--box-file-id', type=str, default=COURSE_ORIENTATION_BOX_FILE_ID,
+                       help='Box file ID')
+    parser.add_argument('--canvas-page-slug', type=str, default=COURSE_ORIENTATION_CANVAS_PAGE_SLUG,
+                       help='Canvas page URL slug')
+    parser.add_argument('--html-file', type=str, default=str(COURSE_ORIENTATION_HTML_FILE),
+                       help='Path to local HTML file')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Always download the DOCX instead of reusing an unchanged cached copy')
+    args = parser.parse_args()
+
+    return update_canvas_from_docx(args.box_file_id, args.canvas_page_slug, args.html_file,
+                                   use_cache=not args.no_cache)
+
 if __name__ == '__main__':
     result = main()
     print(json.dumps(result, indent=2))
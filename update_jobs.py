@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Background job queue for the update-canvas-api server.
+
+An "update canvas" request takes minutes (download the DOCX, apply the
+tracked changes, push to Canvas), too long to hold an HTTP request open.
+JobQueue runs each update as a job on a fixed pool of worker threads, so
+no more than max_workers updates run at once and the request thread only
+enqueues the job and returns its ID. Clients poll the job for its status
+and result. Finished jobs are kept for a while and then forgotten.
+
+Jobs submitted with a key (the Box file and Canvas page of an update) are
+single-flight: while a job for that key is queued or running, further
+requests for the key share it and its result instead of starting another
+run of the same update against the same HTML file. A new keyed job also
+waits out a short debounce window before it is handed to the pool, so a
+burst of clicks becomes one run.
+
+What a job prints is captured per job thread (sys.stdout is shared by
+every thread) and kept as the job's output. A job still running at the
+queue's deadline is failed, whatever its worker thread is doing.
+
+WorkerProcesses runs the update itself in a child process per worker
+thread. The child imports the pipeline script once and serves one call
+after another, so it keeps its warm state between updates. A crash in
+native code or an out-of-memory kill only takes down that child, and a
+call that overruns its timeout has its child killed; either way a fresh
+child is started for the next call.
+"""
+
+import contextlib
+import importlib.util
+import io
+import multiprocessing
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_MAX_WORKERS = 2
+# Seconds a new keyed job waits for duplicate requests before it runs
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+# Seconds a job may run before it is failed
+DEFAULT_JOB_DEADLINE = 300
+# Finished jobs are kept this long for clients to collect their result
+JOB_RETENTION = timedelta(hours=1)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+class ThreadOutput(io.TextIOBase):
+    """sys.stdout stand-in that sends each job thread's writes to its job.
+
+    Threads not running a job write to the stream that was replaced.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def capture(self, buffer):
+        """Send this thread's output to buffer (None to stop capturing)."""
+        self._local.buffer = buffer
+
+    @property
+    def encoding(self):
+        return getattr(self.default, 'encoding', None)
+
+    def _target(self):
+        return getattr(self._local, 'buffer', None) or self.default
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+_thread_output = None
+_thread_output_lock = threading.Lock()
+
+def thread_output():
+    """Install (once) and return the ThreadOutput wrapping sys.stdout."""
+    global _thread_output
+    with _thread_output_lock:
+        if _thread_output is None:
+            _thread_output = ThreadOutput(sys.stdout)
+            sys.stdout = _thread_output
+    return _thread_output
+
+class JobTimeout(Exception):
+    """A worker process call did not finish in time (the process was killed)."""
+
+class WorkerCrashed(Exception):
+    """A worker process exited while running a call."""
+
+class WorkerError(Exception):
+    """The function run in a worker process raised; the message is its error."""
+
+def load_script(path):
+    """Import a (possibly hyphenated) script as a module."""
+    path = Path(path)
+    spec = importlib.util.spec_from_file_location(path.stem.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class _PipeOutput(io.TextIOBase):
+    """Worker-process stdout that sends what a call prints to the parent."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def write(self, text):
+        if text:
+            self.conn.send(('output', text))
+        return len(text)
+
+def _worker_main(conn, script, function, initializer):
+    """Worker process: import script once, then run calls until the pipe closes."""
+    module = load_script(script)
+    if initializer:
+        try:
+            getattr(module, initializer)()
+        except Exception as e:
+            print(f"⚠️  {Path(script).name}: {initializer}() failed: {e}", file=sys.stderr)
+    run = getattr(module, function)
+    while True:
+        try:
+            args, kwargs = conn.recv()
+        except EOFError:
+            return
+        with contextlib.redirect_stdout(_PipeOutput(conn)):
+            try:
+                reply = ('result', run(*args, **kwargs))
+            except (Exception, SystemExit) as e:
+                # Includes SystemExit from a script calling sys.exit()
+                reply = ('error', str(e) or type(e).__name__)
+        conn.send(reply)
+
+class WorkerProcess:
+    """A child process that runs function from script, one call at a time.
+
+    It is started with the spawn method, so it shares no threads or held
+    locks with the server. initializer names a function of the script run
+    once at start-up (e.g. to load config).
+    """
+
+    def __init__(self, script, function, initializer=None):
+        context = multiprocessing.get_context('spawn')
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, str(script), function, initializer),
+                                       name=f'{Path(script).stem}-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    @property
+    def alive(self):
+        return self.process.is_alive()
+
+    def call(self, args=(), kwargs=None, timeout=None):
+        """Run function(*args, **kwargs) in the child and return its result.
+
+        What it prints is written to this thread's sys.stdout as it arrives.
+        Raises JobTimeout (after killing the child) if no result comes
+        within timeout seconds, WorkerCrashed if the child dies, and
+        WorkerError if the function raises.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._conn.send((tuple(args), kwargs or {}))
+            while True:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                if not self._conn.poll(remaining):
+                    self.stop()
+                    raise JobTimeout(f'No result after {timeout:g} seconds')
+                kind, value = self._conn.recv()
+                if kind == 'output':
+                    sys.stdout.write(value)
+                elif kind == 'error':
+                    raise WorkerError(value)
+                else:
+                    return value
+        except (EOFError, OSError):
+            self.stop()
+            raise WorkerCrashed(f'Worker process exited with code {self.process.exitcode}')
+
+    def stop(self):
+        """Kill the child (if still running) and wait for it."""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self._conn.close()
+
+class WorkerProcesses:
+    """One WorkerProcess per calling thread, started on first use.
+
+    Called from JobQueue's worker threads, this keeps at most max_workers
+    children. A child that timed out or crashed is replaced on the next call.
+    """
+
+    def __init__(self, script, function, initializer=None):
+        self.script = script
+        self.function = function
+        self.initializer = initializer
+        self._local = threading.local()
+
+    def call(self, args=(), kwargs=None, timeout=None):
+        """WorkerProcess.call on this thread's worker."""
+        worker = getattr(self._local, 'worker', None)
+        if worker is None or not worker.alive:
+            worker = self._local.worker = WorkerProcess(self.script, self.function, self.initializer)
+        return worker.call(args, kwargs, timeout)
+
+class UpdateJob:
+    """One queued update and, once it has run, its result.
+
+    result is the JSON payload the update produced and http_status the
+    status code it should be served with; output is what it printed.
+    requests counts the requests sharing this job (see JobQueue.submit).
+    """
+
+    def __init__(self, params, key=None):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.key = key
+        self.requests = 1
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.http_status = None
+        self.output = ''
+        self.done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'params': self.params,
+            'requests': self.requests,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'output': self.output,
+        }
+
+class JobQueue:
+    """Run update jobs on a pool of at most max_workers threads.
+
+    run(params) does the work and returns (payload, http_status); an
+    exception it raises fails the job with a 500 payload, leaving the
+    worker thread free for the next job. Keyed jobs start debounce
+    seconds after they are created. A job still running deadline seconds
+    after it started is failed with a 504 payload and its key is freed for
+    new requests; if run returns later, only its output is kept.
+    """
+
+    def __init__(self, run, max_workers=DEFAULT_MAX_WORKERS, debounce=DEFAULT_DEBOUNCE_SECONDS,
+                 deadline=DEFAULT_JOB_DEADLINE):
+        self.run = run
+        self.max_workers = max_workers
+        self.debounce = debounce
+        self.deadline = deadline
+        self._output = thread_output()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='update-job')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, params, key=None):
+        """Queue a job for params; return (job, shared).
+
+        If a job with the same key is still queued or running, no new job
+        is created: that job is returned with shared=True, and its result
+        answers this request too.
+        """
+        with self._lock:
+            self._prune()
+            if key is not None:
+                job = self._in_flight.get(key)
+                if job is not None:
+                    job.requests += 1
+                    return job, True
+            job = UpdateJob(params, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._in_flight[key] = job
+
+        if key is not None and self.debounce > 0:
+            timer = threading.Timer(self.debounce, self._executor.submit, (self._execute, job))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._executor.submit(self._execute, job)
+        return job, False
+
+    def get(self, job_id):
+        """Return the job with this ID, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self):
+        """Number of jobs in each status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _execute(self, job):
+        job.status = RUNNING
+        job.started_at = datetime.now()
+        timer = None
+        if self.deadline:
+            timer = threading.Timer(self.deadline, self._expire, (job,))
+            timer.daemon = True
+            timer.start()
+        output = io.StringIO()
+        self._output.capture(output)
+        try:
+            payload, http_status = self.run(job.params)
+        except BaseException as e:
+            # Includes SystemExit from a script calling sys.exit()
+            payload, http_status = {'success': False, 'message': f'Error: {str(e) or type(e).__name__}'}, 500
+        finally:
+            self._output.capture(None)
+            if timer is not None:
+                timer.cancel()
+        with self._lock:
+            job.output = output.getvalue()
+            # Later requests for this key start a new run
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+            if job.finished:
+                return  # already failed at its deadline
+            job.result = payload
+            job.http_status = http_status
+            job.finished_at = datetime.now()
+            job.status = SUCCEEDED if http_status < 400 and payload.get('success', True) else FAILED
+        job.done.set()
+
+    def _expire(self, job):
+        """Fail a job that is still running at its deadline.
+
+        Its key is released too, so a hung run does not hold later
+        requests for the same key.
+        """
+        with self._lock:
+            if job.finished:
+                return
+            if self._in_flight.get(job.key) is job:
+                del self._in_flight[job.key]
+            job.result = {'success': False, 'message': f'Job did not finish within {self.deadline:g} seconds'}
+            job.http_status = 504
+            job.finished_at = datetime.now()
+            job.status = FAILED
+        job.done.set()
+
+    def _prune(self):
+        cutoff = datetime.now() - JOB_RETENTION
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]